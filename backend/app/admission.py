@@ -0,0 +1,23 @@
+from fastapi import Depends
+from app.auth import get_current_user, AuthenticatedUser
+from app.services.fair_scheduler import Priority, Tenant, current_tenant
+
+
+# These are async so the tenant is set in the request's own context; it then
+# carries over to the LLM calls the handler makes, including those made
+# while a streamed response body is produced.
+
+async def interactive_user(
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
+    """Authenticated user whose LLM calls are scheduled as interactive"""
+    current_tenant.set(Tenant(user_id=current_user.id, priority=Priority.INTERACTIVE))
+    return current_user
+
+
+async def bulk_user(
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
+    """Authenticated user whose LLM calls are scheduled as bulk generation"""
+    current_tenant.set(Tenant(user_id=current_user.id, priority=Priority.BULK))
+    return current_user
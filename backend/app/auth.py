@@ -1,32 +1,178 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
+from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import event
+from app.database import SessionLocal
 from app.models import User
 import os
+import hmac
+import time
+import asyncio
 import hashlib
+import threading
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 1 week
 
+# Verified principals are cached per worker to skip the users lookup
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Accept the user id embedded in the token without checking the database.
+# Deleted users then keep access until their token expires.
+AUTH_TRUST_TOKEN_UID = os.getenv("AUTH_TRUST_TOKEN_UID", "false").lower() in ("1", "true", "yes")
+
+# Password hashing scheme (any passlib scheme, e.g. pbkdf2_sha256, scrypt, argon2)
+# and its cost; benchmarks/password_hashing.py reports login throughput per cost
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "pbkdf2_sha256")
+PASSWORD_ROUNDS = int(os.getenv("PASSWORD_ROUNDS")) if os.getenv("PASSWORD_ROUNDS") else None
+# Threads that run password hashing so logins never block the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
 security = HTTPBearer()
 
 
+class AuthenticatedUser(BaseModel):
+    """The verified principal behind a request"""
+    model_config = ConfigDict(frozen=True)
+    
+    id: int
+    username: str
+
+
+class PrincipalCache:
+    """Bounded TTL cache of verified principals keyed on username"""
+    
+    def __init__(self, ttl: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, username: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return principal
+    
+    def set(self, principal: AuthenticatedUser) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[principal.username] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: int) -> None:
+        """Drop every cached principal for a user id"""
+        with self._lock:
+            stale = [name for name, (_, p) in self._entries.items() if p.id == user_id]
+            for name in stale:
+                del self._entries[name]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    """Forget a cached principal as soon as its user changes or is deleted"""
+    principal_cache.invalidate(target.id)
+
+
+class PasswordHasher:
+    """Tunable password KDF that runs on a bounded thread pool"""
+    
+    def __init__(self, scheme: str = PASSWORD_SCHEME, rounds: Optional[int] = PASSWORD_ROUNDS,
+                 workers: int = PASSWORD_HASH_WORKERS):
+        settings = {f"{scheme}__rounds": rounds} if rounds else {}
+        # deprecated="auto" flags hashes made with older settings for rehashing
+        self.context = CryptContext(schemes=[scheme], deprecated="auto", **settings)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password")
+    
+    def hash(self, password: str) -> str:
+        """Hash a password with the current scheme and cost"""
+        return self.context.hash(password)
+    
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and report whether its hash should be replaced
+        
+        Args:
+            password: Plain text password
+            hashed: Stored hash, either current or legacy unsalted SHA-256
+            
+        Returns:
+            Tuple of (valid, new_hash). new_hash is set when the password is
+            valid but stored under a legacy scheme or outdated cost.
+        """
+        if _is_legacy_hash(hashed):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            if not hmac.compare_digest(legacy, hashed):
+                return False, None
+            return True, self.hash(password)
+        
+        try:
+            return self.context.verify_and_update(password, hashed)
+        except ValueError:
+            # Unknown or malformed hash
+            return False, None
+    
+    def dummy_verify(self) -> None:
+        """Spend the same time as a real verify, for unknown usernames"""
+        self.context.dummy_verify()
+    
+    async def hash_async(self, password: str) -> str:
+        """hash() on the hashing pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.hash, password)
+    
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """verify_and_update() on the hashing pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.verify_and_update, password, hashed)
+    
+    async def dummy_verify_async(self) -> None:
+        """dummy_verify() on the hashing pool"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.dummy_verify)
+
+
+def _is_legacy_hash(hashed: str) -> bool:
+    """Hashes from before the KDF migration are bare SHA-256 hex digests"""
+    return len(hashed) == 64 and all(c in "0123456789abcdef" for c in hashed)
+
+
+password_hasher = PasswordHasher()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    # Simple SHA256 hash for testing (not production-ready but works on Windows)
-    password_hash = hashlib.sha256(plain_password.encode()).hexdigest()
-    return password_hash == hashed_password
+    valid, _ = password_hasher.verify_and_update(plain_password, hashed_password)
+    return valid
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    # Simple SHA256 hash for testing (not production-ready but works on Windows)
-    return hashlib.sha256(password.encode()).hexdigest()
+    return password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -41,11 +187,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_user_token(user: User) -> str:
+    """Create a JWT token carrying both the username and the user id"""
+    return create_access_token(data={"sub": user.username, "uid": user.id})
+
+
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> AuthenticatedUser:
+    """
+    Get the current authenticated user
+    
+    The token signature and expiry are checked on every call. The users
+    lookup only happens on a principal cache miss, in a session opened
+    just for that lookup.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,13 +212,31 @@ def get_current_user(
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
+        user_id: Optional[int] = payload.get("uid")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    principal = principal_cache.get(username)
+    # A cached principal for a re-created account with the same name does not count
+    if principal is not None and (user_id is None or principal.id == user_id):
+        return principal
+    
+    if AUTH_TRUST_TOKEN_UID and user_id is not None:
+        principal = AuthenticatedUser(id=user_id, username=username)
+        principal_cache.set(principal)
+        return principal
+    
+    db = SessionLocal()
+    try:
+        user = db.query(User.id, User.username).filter(User.username == username).first()
+    finally:
+        db.close()
+    
+    if user is None or (user_id is not None and user.id != user_id):
         raise credentials_exception
     
-    return user
+    principal = AuthenticatedUser(id=user.id, username=user.username)
+    principal_cache.set(principal)
+    return principal
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.metrics import DB_SESSION_SECONDS, instrument_engine
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
@@ -9,6 +12,35 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 if os.getenv("VERCEL"):
     DATABASE_URL = "sqlite:////tmp/app.db"
 
+# Some hosts still hand out the postgres:// scheme, which SQLAlchemy 2 rejects
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+
+def _async_url(url: str) -> str:
+    """Swap the driver in a database URL for its asyncio counterpart"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+
+# URL for the routers' async engine (aiosqlite locally, asyncpg for Postgres)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# SQLite tuning
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 256 MB
+
+# Connection pool tuning for server databases (Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
 # Ensure directory exists
 if "sqlite" in DATABASE_URL:
     db_path = DATABASE_URL.replace("sqlite:///", "")
@@ -20,19 +52,108 @@ if "sqlite" in DATABASE_URL:
     
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+
+def _set_sqlite_pragmas(engine: Engine) -> None:
+    """Apply the SQLite pragmas to every new connection of an engine"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+
+def _pool_options() -> dict:
+    """Connection pool settings for server databases"""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """
+    Create an engine with settings chosen for the database backend
+    
+    SQLite connections run in WAL mode so readers never block the writer,
+    with synchronous=NORMAL, a busy timeout instead of immediate
+    "database is locked" errors, and memory-mapped reads. Server databases
+    get a sized, pre-pinged and recycled connection pool.
+    
+    Args:
+        url: SQLAlchemy database URL
+        
+    Returns:
+        Configured engine
+    """
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            }
+        )
+        _set_sqlite_pragmas(engine)
+        return engine
+    
+    return create_engine(url, **_pool_options())
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL) -> AsyncEngine:
+    """
+    Create an asyncio engine with the same per-backend settings as create_db_engine
+    
+    Args:
+        url: SQLAlchemy database URL with an async driver
+        
+    Returns:
+        Configured async engine
+    """
+    if url.startswith("sqlite"):
+        engine = create_async_engine(
+            url,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        )
+        _set_sqlite_pragmas(engine.sync_engine)
+        return engine
+    
+    return create_async_engine(url, **_pool_options())
+
+
+# Sync engine for scripts, migrations and the get_current_user lookup, which
+# FastAPI runs in a worker thread
+engine = create_db_engine(DATABASE_URL)
+instrument_engine(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries never block the event loop.
+# Objects stay loaded after commit; relationships must be eager-loaded.
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+instrument_engine(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
     try:
-        yield db
+        with DB_SESSION_SECONDS.time(engine="sync"):
+            yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    with DB_SESSION_SECONDS.time(engine="async"):
+        async with AsyncSessionLocal() as db:
+            yield db
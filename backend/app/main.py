@@ -4,19 +4,19 @@ import os
 # Load environment variables first
 load_dotenv()
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth, projects, generate, export
+from app.logging_config import configure_logging
 
-# Create database tables on startup
-@app.on_event("startup")
-async def startup_event():
-    Base.metadata.create_all(bind=engine)
+configure_logging()
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok", "vercel": os.getenv("VERCEL"), "db_url": str(engine.url)}
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from app.database import engine, async_engine
+from app.metrics import METRICS_ENABLED, REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from app.migrations import run_migrations
+from app.routers import auth, projects, generate, export, jobs, history
+from app.services.job_service import job_service
+from app.services.render_service import render_service
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,13 +33,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Per-route latency; added last so it is outermost and also times CORS
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(projects.router)
 app.include_router(generate.router)
 app.include_router(export.router)
+app.include_router(jobs.router)
+app.include_router(history.router)
+
+
+# Create or migrate database tables and start the job workers on startup
+@app.on_event("startup")
+async def startup_event():
+    run_migrations(engine)
+    await job_service.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_service.stop()
+    render_service.shutdown()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -53,9 +74,16 @@ async def root():
 
 
 @app.get("/health")
-async def health():
+def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {"status": "ok", "vercel": os.getenv("VERCEL"), "db_url": str(engine.url)}
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics endpoint"""
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import hashlib
+from typing import Optional
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select, update, text
+from sqlalchemy.engine import Engine
+from app.database import Base
+from app.models import RefinementHistory
+from app.services.history_service import encode_history
+
+# Kept out of Base.metadata so it is not part of the fingerprint it stores
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+)
+
+
+def schema_fingerprint() -> str:
+    """Hash of the tables, columns and indexes the models define"""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(f"column {column.name} {column.type!r} {column.nullable}")
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            parts.append(f"index {index.name} {[c.name for c in index.columns]}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def run_migrations(engine: Engine) -> bool:
+    """
+    Bring an existing database up to the current models
+    
+    create_all only creates missing tables, so columns and indexes added
+    to existing tables are created here. Every step is idempotent. A
+    fingerprint of the models is recorded once they succeed, and later
+    calls return after a single lookup while it still matches, so cold
+    starts do not re-inspect the schema.
+    
+    Returns:
+        True if migrations ran, False if the schema was already current
+    """
+    fingerprint = schema_fingerprint()
+    if _stored_fingerprint(engine) == fingerprint:
+        return False
+    
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    _compact_refinement_history(engine)
+    
+    schema_version.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(schema_version.delete())
+        conn.execute(schema_version.insert().values(id=1, fingerprint=fingerprint))
+    return True
+
+
+def _stored_fingerprint(engine: Engine) -> Optional[str]:
+    """Fingerprint recorded by the last successful migration, if any"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return None
+        return conn.execute(
+            select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+        ).scalar_one_or_none()
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """Add model columns missing from existing tables (nullable columns only)"""
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.quote(table.name)} "
+                    f"ADD COLUMN {preparer.quote(column.name)} {column_type}"
+                ))
+
+
+def _compact_refinement_history(engine: Engine) -> None:
+    """Re-encode full-text history rows as compressed keyframes and deltas"""
+    history = RefinementHistory.__table__
+
+    with engine.connect() as conn:
+        section_ids = conn.execute(
+            select(history.c.section_id).where(history.c.payload.is_(None)).distinct()
+        ).scalars().all()
+
+    # One transaction per section keeps memory and lock time bounded
+    for section_id in section_ids:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(history.c.id, history.c.previous_content, history.c.new_content)
+                .where(history.c.section_id == section_id, history.c.payload.is_(None))
+                .order_by(history.c.id)
+            ).all()
+
+            for values in encode_history(rows):
+                conn.execute(
+                    update(history)
+                    .where(history.c.id == values.pop("id"))
+                    .values(previous_content=None, new_content=None, **values)
+                )
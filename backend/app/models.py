@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -16,6 +16,20 @@ class FeedbackType(str, enum.Enum):
     NONE = "none"
 
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class SectionStatus(str, enum.Enum):
+    PENDING = "pending"  # Not generated yet
+    GENERATED = "generated"
+    FAILED = "failed"  # Last generation attempt failed; see DocumentSection.error
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -40,16 +54,26 @@ class Project(Base):
     
     user = relationship("User", back_populates="projects")
     sections = relationship("DocumentSection", back_populates="project", cascade="all, delete-orphan")
+    jobs = relationship("GenerationJob", back_populates="project", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Serves the paginated project listing per user
+        Index("ix_projects_user_id_created_at", "user_id", "created_at"),
+    )
 
 
 class DocumentSection(Base):
     __tablename__ = "document_sections"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     title = Column(String(300), nullable=False)  # Section heading or slide title
     content = Column(Text, nullable=True)  # Generated content
     order_index = Column(Integer, nullable=False)  # Order in document
+    # Stored as a plain string so the migration can add it without a database enum type
+    status = Column(Enum(SectionStatus, native_enum=False, length=20), nullable=True,
+                    default=SectionStatus.PENDING)
+    error = Column(Text, nullable=True)  # Why the last generation attempt failed
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -63,10 +87,64 @@ class RefinementHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     section_id = Column(Integer, ForeignKey("document_sections.id"), nullable=False)
     prompt = Column(Text, nullable=True)  # User's refinement prompt
+    # Full-text columns of rows written before history compaction; cleared by the migration
     previous_content = Column(Text, nullable=True)
     new_content = Column(Text, nullable=True)
+    # Compressed keyframe or delta, see app.services.history_service
+    payload = Column(LargeBinary, nullable=True)
+    base_id = Column(Integer, nullable=True)  # Entry the delta is relative to; NULL for keyframes
+    keyframe_id = Column(Integer, nullable=True)  # Keyframe the chain starts from
+    chain_length = Column(Integer, nullable=True, default=0)  # Deltas since the keyframe
     feedback = Column(Enum(FeedbackType), default=FeedbackType.NONE)
     comment = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     section = relationship("DocumentSection", back_populates="refinements")
+    
+    __table_args__ = (
+        # Serves the paginated history listing and feedback counts per section
+        Index("ix_refinement_history_section_id_created_at", "section_id", "created_at"),
+    )
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    context_mode = Column(String(20), nullable=False)  # See generation_service.ContextMode
+    concurrency = Column(Integer, nullable=True)
+    use_cache = Column(Boolean, default=True, nullable=False)
+    total_sections = Column(Integer, default=0, nullable=False)
+    completed_sections = Column(Integer, default=0, nullable=False)
+    failed_sections = Column(Integer, default=0, nullable=False)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    error = Column(Text, nullable=True)
+    # Worker process holding a running job, and until when; an expired lease
+    # means that worker died and another one may take the job over
+    worker_id = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    project = relationship("Project", back_populates="jobs")
+    items = relationship("GenerationJobItem", back_populates="job", cascade="all, delete-orphan",
+                         order_by="GenerationJobItem.order_index")
+
+
+class GenerationJobItem(Base):
+    __tablename__ = "generation_job_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), nullable=False, index=True)
+    section_id = Column(Integer, ForeignKey("document_sections.id"), nullable=False)
+    order_index = Column(Integer, nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    job = relationship("GenerationJob", back_populates="items")
@@ -0,0 +1,29 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Tuple
+from fastapi import HTTPException, status
+
+
+def encode_cursor(sort_field: str, value: Any, row_id: int) -> str:
+    """Encode the position after a row as an opaque cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort_field, value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor for the same sort field"""
+    try:
+        field, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if field != sort_field:
+            raise ValueError("cursor belongs to a different sort order")
+        if sort_field == "created_at":
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
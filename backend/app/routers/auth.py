@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field, field_validator
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
-from app.auth import get_password_hash, create_access_token, verify_password
+from app.auth import password_hasher, create_user_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -32,7 +33,7 @@ class Token(BaseModel):
 
 
 @router.post("/register", response_model=Token)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Validate password
     if not user_data.password or len(user_data.password) < 6:
@@ -48,7 +49,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Check if username exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    result = await db.execute(select(User).where(User.username == user_data.username))
+    existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,18 +58,18 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Hash on the password pool; the KDF is deliberately slow
+    hashed_password = await password_hasher.hash_async(user_data.password)
     new_user = User(
         username=user_data.username,
         password_hash=hashed_password
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     
     # Create access token
-    access_token = create_access_token(data={"sub": new_user.username})
+    access_token = create_user_token(new_user)
     
     return {
         "access_token": access_token,
@@ -77,18 +79,33 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login existing user"""
-    user = db.query(User).filter(User.username == user_data.username).first()
+    result = await db.execute(select(User).where(User.username == user_data.username))
+    user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    if not user:
+        # Take as long as a real check so usernames cannot be probed by timing
+        await password_hasher.dummy_verify_async()
+        valid, new_hash = False, None
+    else:
+        valid, new_hash = await password_hasher.verify_and_update_async(
+            user_data.password, user.password_hash
+        )
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
+    # Transparently upgrade legacy SHA-256 hashes and outdated KDF costs
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # Create access token
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_user_token(user)
     
     return {
         "access_token": access_token,
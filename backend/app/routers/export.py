@@ -1,27 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+import asyncio
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Project
-from app.auth import get_current_user
-from app.services.docx_service import docx_service
-from app.services.pptx_service import pptx_service
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import BinaryIO, Iterator, Optional
+from app.database import get_async_db
+from app.models import Project
+from app.auth import get_current_user, AuthenticatedUser
+from app.services.render_service import render_service, RenderSaturatedError
+from app.services.export_cache import export_cache, content_hash
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
+MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# Read size when streaming an export, the same as FileResponse uses
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _read_chunks(handle: BinaryIO) -> Iterator[bytes]:
+    """Read an open file in chunks and close it; Starlette runs this on a thread"""
+    with handle:
+        while True:
+            chunk = handle.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition value, RFC 5987 encoded for non-ASCII names"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
 
 @router.get("/{project_id}")
 async def export_document(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Export project as .docx or .pptx file"""
     # Get project
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(
@@ -39,26 +82,54 @@ async def export_document(
         for s in sections
     ]
     
-    # Generate file based on type
-    if project.doc_type.value == "docx":
-        file_stream = docx_service.generate_document(
-            title=project.title,
-            sections=sections_data
-        )
-        media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        filename = f"{project.title}.docx"
-    else:  # pptx
-        file_stream = pptx_service.generate_presentation(
-            title=project.title,
-            slides=sections_data
-        )
-        media_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-        filename = f"{project.title}.pptx"
+    doc_type = project.doc_type.value
+    digest = content_hash(project.title, doc_type, sections_data)
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
     
+    # The client already has this exact revision
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    handle = export_cache.open(project.id, digest, doc_type)
+    if handle is None:
+        # End the read transaction so the connection goes back to the pool
+        # while the document renders
+        await db.commit()
+        
+        # Render on the worker pool, straight to disk, so neither the event
+        # loop nor this process's memory carries the document. On failure
+        # the render service removes the file once its worker is done with it.
+        temp_path = export_cache.temp_path()
+        try:
+            await render_service.render(doc_type, project.title, sections_data, temp_path)
+        except RenderSaturatedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Export service is busy, please retry shortly",
+                headers={"Retry-After": "2"}
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Export took too long to render"
+            )
+        # Opened before it is moved into place; the move keeps the same file
+        handle = open(temp_path, "rb")
+        try:
+            export_cache.put(project.id, digest, doc_type, temp_path)
+        except Exception:
+            handle.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    # Stream from the open handle rather than the path, so a newer revision
+    # replacing the cached file mid-response cannot make it fail
+    headers["Content-Length"] = str(os.fstat(handle.fileno()).st_size)
+    headers["Content-Disposition"] = _attachment(f"{project.title}.{doc_type}")
     return StreamingResponse(
-        file_stream,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+        _read_chunks(handle),
+        media_type=MEDIA_TYPES[doc_type],
+        headers=headers
     )
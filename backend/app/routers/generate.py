@@ -1,11 +1,22 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, contains_eager
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from app.database import get_db
-from app.models import User, Project, DocumentSection, RefinementHistory, FeedbackType
-from app.auth import get_current_user
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import Project, DocumentSection, FeedbackType, SectionStatus
+from app.auth import get_current_user, AuthenticatedUser
+from app.admission import interactive_user, bulk_user
+from app.sse import SSE_HEADERS, format_sse
 from app.services.llm_service import llm_service
+from app.services.generation_service import generation_service, ContextMode
+from app.services.section_writer import SectionWriter, mark_section
+from app.services.history_service import history_service
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/generate", tags=["Generation"])
 
@@ -14,6 +25,7 @@ class OutlineRequest(BaseModel):
     topic: str
     doc_type: str
     num_items: int = 5
+    bypass_cache: bool = False
 
 
 class OutlineResponse(BaseModel):
@@ -22,6 +34,12 @@ class OutlineResponse(BaseModel):
 
 class GenerateContentRequest(BaseModel):
     project_id: int
+    context_mode: ContextMode = ContextMode.CHAINED
+    concurrency: Optional[int] = Field(None, ge=1, le=32)
+    bypass_cache: bool = False
+    # Sections per LLM call (not used when streaming); defaults to
+    # GENERATION_BATCH_SIZE for pptx and 1 for docx
+    batch_size: Optional[int] = Field(None, ge=1, le=20)
 
 
 class RefineContentRequest(BaseModel):
@@ -37,36 +55,63 @@ class FeedbackRequest(BaseModel):
 
 class ContentResponse(BaseModel):
     section_id: int
-    content: str
+    content: Optional[str]
+    error: Optional[str] = None
+    prompt_tokens: Optional[int] = None  # Estimated size of the prompt sent for the section
 
 
 @router.post("/outline", response_model=OutlineResponse)
 async def generate_outline(
     request: OutlineRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(interactive_user)
 ):
     """Generate an AI-suggested outline"""
-    headings = await llm_service.generate_outline(
-        topic=request.topic,
-        doc_type=request.doc_type,
-        num_items=request.num_items
-    )
+    try:
+        headings = await llm_service.generate_outline(
+            topic=request.topic,
+            doc_type=request.doc_type,
+            num_items=request.num_items,
+            use_cache=not request.bypass_cache
+        )
+    except Exception as e:
+        logger.warning("Error generating outline: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Outline generation failed: {e}"
+        )
     
     return {"headings": headings}
 
 
+@router.get("/cache/stats")
+async def cache_stats(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """LLM response cache and request coalescing counters for this worker"""
+    coalescing = llm_service.flights.stats()
+    if llm_service.cache is None:
+        return {"enabled": False, "coalescing": coalescing}
+    return {"enabled": True, **llm_service.cache.stats(), "coalescing": coalescing}
+
+
+@router.get("/scheduler/stats")
+async def scheduler_stats(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """LLM call slots in use and calls waiting for one, per priority, for this worker"""
+    return llm_service.scheduler.stats()
+
+
 @router.post("/content", response_model=List[ContentResponse])
 async def generate_content(
     request: GenerateContentRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(bulk_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate content for all sections in a project"""
     # Get project
-    project = db.query(Project).filter(
-        Project.id == request.project_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == request.project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(
@@ -76,52 +121,114 @@ async def generate_content(
     
     # Get sections ordered
     sections = sorted(project.sections, key=lambda s: s.order_index)
+    sections_by_id = {s.id: s for s in sections}
+    
+    logger.info(
+        "Generating %d sections for project %s (%s, %s mode)",
+        len(sections), project.id, project.doc_type.value, request.context_mode.value
+    )
     
-    results = []
-    context = ""
+    # End the read transaction so the connection goes back to the pool
+    # while the LLM works
+    await db.commit()
     
-    for section in sections:
-        # Generate content
-        print(f"[GENERATE] Generating content for section: {section.title}")
-        print(f"[GENERATE] Topic: {project.topic or project.title}")
-        print(f"[GENERATE] Doc type: {project.doc_type.value}")
-        
-        content = await llm_service.generate_content(
+    # Results are saved in batched checkpoints as sections finish; whatever
+    # finished is saved even if generation is interrupted
+    writer = SectionWriter(db, sections_by_id)
+    try:
+        generated = await generation_service.generate_sections(
             topic=project.topic or project.title,
-            section_title=section.title,
             doc_type=project.doc_type.value,
-            context=context[:500] if context else ""  # Limit context size
+            sections=[
+                {"id": s.id, "title": s.title, "order_index": s.order_index}
+                for s in sections
+            ],
+            context_mode=request.context_mode,
+            concurrency=request.concurrency,
+            use_cache=not request.bypass_cache,
+            on_result=writer.add,
+            batch_size=request.batch_size
         )
-        
-        print(f"[GENERATE] Generated content length: {len(content) if content else 0}")
-        print(f"[GENERATE] Content preview: {content[:100] if content else 'EMPTY!'}")
-        
-        # Update section
-        section.content = content
-        db.commit()
-        
-        print(f"[GENERATE] Saved content for section {section.id}")
-        
-        results.append(ContentResponse(section_id=section.id, content=content))
-        
-        # Add to context for next section
-        context += f"\n{section.title}: {content[:200]}..."
+    finally:
+        await writer.flush()
+    
+    saved = sum(1 for item in generated if item['error'] is None)
+    logger.info(
+        "Saved content for %d of %d sections of project %s in %d commits",
+        saved, len(generated), project.id, writer.commits
+    )
+    
+    # Failed sections keep their previous content and are marked failed
+    # with the error
+    return [ContentResponse(**item) for item in generated]
+
+
+@router.post("/content/stream")
+async def stream_content(
+    request: GenerateContentRequest,
+    current_user: AuthenticatedUser = Depends(bulk_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Generate content for all sections, streamed as server-sent events"""
+    # Get project
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == request.project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    topic = project.topic or project.title
+    doc_type = project.doc_type.value
+    sections = [
+        {"id": s.id, "title": s.title, "order_index": s.order_index}
+        for s in project.sections
+    ]
+    
+    async def events():
+        # The request-scoped session is closed once the handler returns
+        async with AsyncSessionLocal() as stream_db:
+            async for item in generation_service.stream_sections(
+                topic=topic,
+                doc_type=doc_type,
+                sections=sections,
+                context_mode=request.context_mode,
+                use_cache=not request.bypass_cache
+            ):
+                event = item.pop("event")
+                if event in ("section_end", "section_error"):
+                    # Persist each section, or its failure, as soon as it is known
+                    section = await stream_db.get(DocumentSection, item['section_id'])
+                    mark_section(section, {"content": item.get('content'), "error": item.get('error')})
+                    await stream_db.commit()
+                yield format_sse(event, item)
+            
+            yield format_sse("done", {"project_id": request.project_id})
     
-    return results
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.post("/refine", response_model=ContentResponse)
 async def refine_content(
     request: RefineContentRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(interactive_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Refine content for a specific section"""
     # Get section
-    section = db.query(DocumentSection).join(Project).filter(
-        DocumentSection.id == request.section_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(DocumentSection)
+        .join(Project)
+        .options(contains_eager(DocumentSection.project))
+        .where(DocumentSection.id == request.section_id, Project.user_id == current_user.id)
+    )
+    section = result.scalar_one_or_none()
     
     if not section:
         raise HTTPException(
@@ -131,43 +238,130 @@ async def refine_content(
     
     # Store previous content
     previous_content = section.content or ""
+    doc_type = section.project.doc_type.value
     
-    # Refine content
-    new_content = await llm_service.refine_content(
-        current_content=previous_content,
-        refinement_prompt=request.prompt,
-        section_title=section.title,
-        doc_type=section.project.doc_type.value
-    )
+    # End the read transaction so the connection goes back to the pool
+    # while the LLM works
+    await db.commit()
+    
+    # Refine content; on failure the section is left as it was
+    try:
+        new_content = await llm_service.refine_content(
+            current_content=previous_content,
+            refinement_prompt=request.prompt,
+            section_title=section.title,
+            doc_type=doc_type
+        )
+    except Exception as e:
+        logger.warning("Error refining section %s: %s", section.id, e)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Refinement failed: {e}"
+        )
     
     # Update section
     section.content = new_content
+    section.status = SectionStatus.GENERATED
+    section.error = None
     
     # Save refinement history
-    refinement = RefinementHistory(
+    await history_service.record(
+        db,
         section_id=section.id,
-        prompt=request.prompt,
         previous_content=previous_content,
-        new_content=new_content
+        new_content=new_content,
+        prompt=request.prompt
     )
-    db.add(refinement)
-    db.commit()
+    await db.commit()
     
     return ContentResponse(section_id=section.id, content=new_content)
 
 
+@router.post("/refine/stream")
+async def stream_refine(
+    request: RefineContentRequest,
+    current_user: AuthenticatedUser = Depends(interactive_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Refine content for a specific section, streamed as server-sent events"""
+    # Get section
+    result = await db.execute(
+        select(DocumentSection)
+        .join(Project)
+        .options(contains_eager(DocumentSection.project))
+        .where(DocumentSection.id == request.section_id, Project.user_id == current_user.id)
+    )
+    section = result.scalar_one_or_none()
+    
+    if not section:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Section not found"
+        )
+    
+    section_id = section.id
+    section_title = section.title
+    previous_content = section.content or ""
+    doc_type = section.project.doc_type.value
+    
+    async def events():
+        yield format_sse("section_start", {"section_id": section_id, "title": section_title})
+        
+        parts = []
+        try:
+            async for delta in llm_service.stream_refine(
+                current_content=previous_content,
+                refinement_prompt=request.prompt,
+                section_title=section_title,
+                doc_type=doc_type
+            ):
+                parts.append(delta)
+                yield format_sse("delta", {"section_id": section_id, "text": delta})
+        except Exception as e:
+            logger.warning("Error streaming refinement for section %s: %s", section_id, e)
+            yield format_sse("section_error", {"section_id": section_id, "error": str(e)})
+            return
+        
+        new_content = "".join(parts).strip()
+        if not new_content:
+            yield format_sse("section_error", {"section_id": section_id, "error": "The model returned no refinement"})
+            return
+        
+        # Update section and save refinement history
+        async with AsyncSessionLocal() as stream_db:
+            section = await stream_db.get(DocumentSection, section_id)
+            section.content = new_content
+            section.status = SectionStatus.GENERATED
+            section.error = None
+            await history_service.record(
+                stream_db,
+                section_id=section_id,
+                previous_content=previous_content,
+                new_content=new_content,
+                prompt=request.prompt
+            )
+            await stream_db.commit()
+        
+        yield format_sse("section_end", {"section_id": section_id, "content": new_content})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/feedback")
 async def add_feedback(
     request: FeedbackRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add feedback (like/dislike/comment) to a section"""
     # Get section
-    section = db.query(DocumentSection).join(Project).filter(
-        DocumentSection.id == request.section_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(DocumentSection)
+        .join(Project)
+        .options(contains_eager(DocumentSection.project))
+        .where(DocumentSection.id == request.section_id, Project.user_id == current_user.id)
+    )
+    section = result.scalar_one_or_none()
     
     if not section:
         raise HTTPException(
@@ -175,15 +369,16 @@ async def add_feedback(
             detail="Section not found"
         )
     
-    # Create feedback entry in refinement history
-    feedback_entry = RefinementHistory(
+    # Create feedback entry in refinement history; the unchanged content
+    # is stored as a reference to the previous entry, not a second copy
+    await history_service.record(
+        db,
         section_id=section.id,
-        feedback=request.feedback,
-        comment=request.comment,
         previous_content=section.content,
-        new_content=section.content
+        new_content=section.content,
+        feedback=request.feedback,
+        comment=request.comment
     )
-    db.add(feedback_entry)
-    db.commit()
+    await db.commit()
     
     return {"message": "Feedback recorded"}
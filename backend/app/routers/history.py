@@ -0,0 +1,219 @@
+import enum
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, func, case, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_async_db
+from app.models import Project, DocumentSection, RefinementHistory, FeedbackType
+from app.auth import get_current_user, AuthenticatedUser
+from app.pagination import encode_cursor, decode_cursor
+from app.services.history_service import history_service
+
+router = APIRouter(prefix="/history", tags=["History"])
+
+
+class HistoryKind(str, enum.Enum):
+    ALL = "all"
+    REFINEMENT = "refinement"  # Entries with a refinement prompt
+    FEEDBACK = "feedback"  # Likes, dislikes and comments
+
+
+class HistoryEntryResponse(BaseModel):
+    id: int
+    section_id: int
+    prompt: Optional[str]
+    feedback: Optional[FeedbackType]
+    comment: Optional[str]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class RevisionResponse(HistoryEntryResponse):
+    previous_content: Optional[str]
+    new_content: Optional[str]
+
+
+class FeedbackCounts(BaseModel):
+    likes: int
+    dislikes: int
+    comments: int
+    refinements: int
+
+
+class SectionFeedbackSummary(FeedbackCounts):
+    section_id: int
+
+
+class ProjectFeedbackSummary(FeedbackCounts):
+    project_id: int
+    sections: List[SectionFeedbackSummary]
+
+
+IS_FEEDBACK = or_(
+    RefinementHistory.feedback.in_([FeedbackType.LIKE, FeedbackType.DISLIKE]),
+    RefinementHistory.comment.isnot(None)
+)
+
+
+def _feedback_counts():
+    """Aggregate columns counting feedback and refinements over history rows"""
+    return (
+        func.count(case((RefinementHistory.feedback == FeedbackType.LIKE, 1))).label("likes"),
+        func.count(case((RefinementHistory.feedback == FeedbackType.DISLIKE, 1))).label("dislikes"),
+        func.count(RefinementHistory.comment).label("comments"),
+        func.count(RefinementHistory.prompt).label("refinements"),
+    )
+
+
+@router.get("/sections/{section_id}", response_model=List[HistoryEntryResponse])
+async def get_section_history(
+    section_id: int,
+    response: Response,
+    kind: HistoryKind = HistoryKind.ALL,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of refinement and feedback entries for a section, newest first
+    
+    When more results exist the X-Next-Cursor response header holds the
+    cursor for the next page.
+    """
+    result = await db.execute(
+        select(DocumentSection.id)
+        .join(Project)
+        .where(DocumentSection.id == section_id, Project.user_id == current_user.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Section not found"
+        )
+    
+    # Only the listed columns; the payload blob and legacy full-text columns
+    # are read when a single revision is opened
+    query = (
+        select(RefinementHistory)
+        .options(load_only(
+            RefinementHistory.id, RefinementHistory.section_id, RefinementHistory.prompt,
+            RefinementHistory.feedback, RefinementHistory.comment, RefinementHistory.created_at
+        ))
+        .where(RefinementHistory.section_id == section_id)
+    )
+    
+    if kind == HistoryKind.REFINEMENT:
+        query = query.where(RefinementHistory.prompt.isnot(None))
+    elif kind == HistoryKind.FEEDBACK:
+        query = query.where(IS_FEEDBACK)
+    
+    # Keyset pagination over (created_at, id), served by the
+    # (section_id, created_at) index
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, "created_at")
+        query = query.where(or_(
+            RefinementHistory.created_at < created_at,
+            and_(RefinementHistory.created_at == created_at, RefinementHistory.id < last_id)
+        ))
+    
+    query = query.order_by(RefinementHistory.created_at.desc(), RefinementHistory.id.desc())
+    
+    # Fetch one extra row to learn whether another page exists
+    entries = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor("created_at", last.created_at, last.id)
+    
+    return entries
+
+
+@router.get("/projects/{project_id}/feedback", response_model=ProjectFeedbackSummary)
+async def get_project_feedback(
+    project_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Feedback and refinement counts for a project and each of its sections"""
+    result = await db.execute(
+        select(Project.id).where(Project.id == project_id, Project.user_id == current_user.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    # Counted in the database; only one row per section comes back
+    rows = (await db.execute(
+        select(RefinementHistory.section_id, *_feedback_counts())
+        .join(DocumentSection)
+        .where(DocumentSection.project_id == project_id)
+        .group_by(RefinementHistory.section_id)
+        .order_by(RefinementHistory.section_id)
+    )).all()
+    
+    totals = (await db.execute(
+        select(*_feedback_counts())
+        .join(DocumentSection)
+        .where(DocumentSection.project_id == project_id)
+    )).one()
+    
+    return ProjectFeedbackSummary(
+        project_id=project_id,
+        likes=totals.likes,
+        dislikes=totals.dislikes,
+        comments=totals.comments,
+        refinements=totals.refinements,
+        sections=[
+            SectionFeedbackSummary(
+                section_id=row.section_id,
+                likes=row.likes,
+                dislikes=row.dislikes,
+                comments=row.comments,
+                refinements=row.refinements
+            )
+            for row in rows
+        ]
+    )
+
+
+@router.get("/{entry_id}", response_model=RevisionResponse)
+async def get_revision(
+    entry_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a history entry with its content before and after, rebuilt from storage"""
+    result = await db.execute(
+        select(RefinementHistory)
+        .join(DocumentSection)
+        .join(Project)
+        .where(RefinementHistory.id == entry_id, Project.user_id == current_user.id)
+    )
+    entry = result.scalar_one_or_none()
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="History entry not found"
+        )
+    
+    previous_content, new_content = await history_service.reconstruct(db, entry)
+    
+    return RevisionResponse(
+        id=entry.id,
+        section_id=entry.section_id,
+        prompt=entry.prompt,
+        feedback=entry.feedback,
+        comment=entry.comment,
+        created_at=entry.created_at,
+        previous_content=previous_content,
+        new_content=new_content
+    )
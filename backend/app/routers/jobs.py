@@ -0,0 +1,154 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import Project, GenerationJob, JobStatus
+from app.auth import get_current_user, AuthenticatedUser
+from app.sse import SSE_HEADERS, format_sse
+from app.services.generation_service import ContextMode
+from app.services.job_service import job_service, TERMINAL_STATUSES, JOB_POLL_INTERVAL
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+class JobCreate(BaseModel):
+    project_id: int
+    context_mode: ContextMode = ContextMode.CHAINED
+    concurrency: Optional[int] = Field(None, ge=1, le=32)
+    bypass_cache: bool = False
+
+
+class JobItemResponse(BaseModel):
+    section_id: int
+    order_index: int
+    status: JobStatus
+    error: Optional[str]
+    
+    class Config:
+        from_attributes = True
+
+
+class JobResponse(BaseModel):
+    id: int
+    project_id: int
+    status: JobStatus
+    context_mode: str
+    total_sections: int
+    completed_sections: int
+    failed_sections: int
+    cancel_requested: bool
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    items: List[JobItemResponse]
+    
+    class Config:
+        from_attributes = True
+
+
+async def _get_job(db: AsyncSession, job_id: int, user_id: int) -> GenerationJob:
+    job = await job_service.load_job(db, job_id, user_id=user_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_data: JobCreate,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Queue content generation for all sections of a project"""
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == job_data.project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    return await job_service.submit(
+        db,
+        user_id=current_user.id,
+        project=project,
+        context_mode=job_data.context_mode,
+        concurrency=job_data.concurrency,
+        use_cache=not job_data.bypass_cache
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a job with per-section progress"""
+    return await _get_job(db, job_id, current_user.id)
+
+
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Subscribe to job progress as server-sent events"""
+    await _get_job(db, job_id, current_user.id)
+    
+    async def events():
+        last = None
+        # The request-scoped session is closed once the handler returns
+        async with AsyncSessionLocal() as poll_db:
+            while True:
+                job = await job_service.load_job(poll_db, job_id)
+                snapshot = JobResponse.model_validate(job).model_dump(mode="json") if job else None
+                # End the read transaction so the next poll sees newly
+                # committed progress and the connection goes back to the pool
+                await poll_db.close()
+                
+                if snapshot is None:
+                    # The project (and with it the job) was deleted
+                    yield format_sse("done", {"job_id": job_id, "status": None})
+                    return
+                
+                if snapshot != last:
+                    yield format_sse("progress", snapshot)
+                    last = snapshot
+                
+                if JobStatus(snapshot["status"]) in TERMINAL_STATUSES:
+                    yield format_sse("done", {"job_id": job_id, "status": snapshot["status"]})
+                    return
+                
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancel a queued or running job"""
+    job = await _get_job(db, job_id, current_user.id)
+    return await job_service.request_cancel(db, job)
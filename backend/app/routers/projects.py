@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, insert, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from app.database import get_db
-from app.models import User, Project, DocumentSection, DocumentType
-from app.auth import get_current_user
+from app.database import get_async_db
+from app.models import Project, DocumentSection, DocumentType, SectionStatus
+from app.auth import get_current_user, AuthenticatedUser
+from app.pagination import encode_cursor, decode_cursor
+from app.services.export_cache import export_cache
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
+# Columns the project listing can be sorted by
+SORT_COLUMNS = {
+    "created_at": Project.created_at,
+    "title": Project.title,
+}
+
 
 class SectionCreate(BaseModel):
     title: str
@@ -32,6 +43,8 @@ class SectionResponse(BaseModel):
     title: str
     content: Optional[str]
     order_index: int
+    status: Optional[SectionStatus] = None
+    error: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -63,29 +76,90 @@ class ProjectListItem(BaseModel):
 
 @router.get("/", response_model=List[ProjectListItem])
 async def get_projects(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    sort: str = Query("-created_at", pattern="^-?(created_at|title)$"),
+    q: Optional[str] = Query(None, max_length=200, description="Case-insensitive title search"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all projects for the current user"""
-    projects = db.query(Project).filter(Project.user_id == current_user.id).all()
+    """
+    Get a page of projects for the current user
+    
+    Sort with `sort` (prefix `-` for descending). When more results exist
+    the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    sort_field = sort.lstrip("-")
+    descending = sort.startswith("-")
+    sort_column = SORT_COLUMNS[sort_field]
+    
+    # Count sections in SQL instead of loading every section row
+    section_count = (
+        select(func.count(DocumentSection.id))
+        .where(DocumentSection.project_id == Project.id)
+        .correlate(Project)
+        .scalar_subquery()
+        .label("section_count")
+    )
+    
+    query = select(
+        Project.id,
+        Project.title,
+        Project.doc_type,
+        Project.created_at,
+        section_count
+    ).where(Project.user_id == current_user.id)
+    
+    if q:
+        pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(Project.title.ilike(f"%{pattern}%", escape="\\"))
+    
+    # Keyset pagination: continue strictly after the last row of the previous page
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_field)
+        if descending:
+            query = query.where(or_(
+                sort_column < value,
+                and_(sort_column == value, Project.id < last_id)
+            ))
+        else:
+            query = query.where(or_(
+                sort_column > value,
+                and_(sort_column == value, Project.id > last_id)
+            ))
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), Project.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Project.id.asc())
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_field, getattr(last, sort_field), last.id
+        )
     
     return [
         ProjectListItem(
-            id=p.id,
-            title=p.title,
-            doc_type=p.doc_type,
-            created_at=p.created_at,
-            section_count=len(p.sections)
+            id=row.id,
+            title=row.title,
+            doc_type=row.doc_type,
+            created_at=row.created_at,
+            section_count=row.section_count
         )
-        for p in projects
+        for row in rows
     ]
 
 
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new project"""
     # Create project
@@ -97,20 +171,28 @@ async def create_project(
     )
     
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
-    
-    # Create sections
-    for section_data in project_data.sections:
-        new_section = DocumentSection(
-            project_id=new_project.id,
-            title=section_data.title,
-            order_index=section_data.order_index
+    await db.flush()
+    
+    # Create all sections with one multi-row INSERT ... RETURNING
+    sections = []
+    if project_data.sections:
+        result = await db.scalars(
+            insert(DocumentSection).returning(DocumentSection),
+            [
+                {
+                    "project_id": new_project.id,
+                    "title": section_data.title,
+                    "order_index": section_data.order_index
+                }
+                for section_data in project_data.sections
+            ]
         )
-        db.add(new_section)
+        sections = sorted(result.all(), key=lambda s: s.id)
+    set_committed_value(new_project, "sections", sections)
     
-    db.commit()
-    db.refresh(new_project)
+    # One commit for the whole project; attributes stay loaded afterwards,
+    # so no refresh round-trip is needed
+    await db.commit()
     
     return new_project
 
@@ -118,14 +200,16 @@ async def create_project(
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(
@@ -140,14 +224,16 @@ async def get_project(
 async def update_project(
     project_id: int,
     project_data: ProjectUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Project)
+        .options(selectinload(Project.sections))
+        .where(Project.id == project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(
@@ -160,8 +246,8 @@ async def update_project(
     if project_data.topic is not None:
         project.topic = project_data.topic
     
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    export_cache.invalidate(project.id)
     
     return project
 
@@ -169,14 +255,14 @@ async def update_project(
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Project).where(Project.id == project_id, Project.user_id == current_user.id)
+    )
+    project = result.scalar_one_or_none()
     
     if not project:
         raise HTTPException(
@@ -184,5 +270,6 @@ async def delete_project(
             detail="Project not found"
         )
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
+    export_cache.invalidate(project_id)
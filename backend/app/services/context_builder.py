@@ -0,0 +1,136 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import List, Tuple
+
+# Token budget for the summary of earlier sections in chained generation
+GENERATION_CONTEXT_TOKENS = int(os.getenv("GENERATION_CONTEXT_TOKENS", "300"))
+# Key sentences kept per earlier section when the budget allows
+GENERATION_CONTEXT_KEY_POINTS = int(os.getenv("GENERATION_CONTEXT_KEY_POINTS", "2"))
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_PATTERN = re.compile(r"[a-z][a-z'-]{2,}")
+
+_STOPWORDS = frozenset(
+    "the and for with that this from are was were will can have has had not but its their "
+    "they them these those into over such than then there which while what when where who "
+    "how our your you all any each more most other some also may might should would could "
+    "been being about between through during before after above below very just only both "
+    "use used using make makes made well many much one two new".split()
+)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the tokens a subword tokenizer would produce for text
+
+    Words and punctuation count as one token each; long words count once
+    per six characters, roughly how BPE vocabularies split them.
+    """
+    return sum(math.ceil(len(piece) / 6) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def key_points(content: str, limit: int) -> List[str]:
+    """
+    Pick the sentences that best summarise a section, in their original order
+
+    The first sentence is always kept since it usually states the topic.
+    The rest are ranked by how many of the section's frequent content
+    words they contain, per word, so long sentences are not favoured.
+    """
+    sentences = [s.strip(" -•*\t") for s in _SENTENCE_PATTERN.split(content)]
+    sentences = [s for s in sentences if len(s) > 1]
+    if limit <= 0 or not sentences:
+        return []
+    if len(sentences) <= limit:
+        return sentences
+
+    def words(sentence: str) -> List[str]:
+        return [w for w in _WORD_PATTERN.findall(sentence.lower()) if w not in _STOPWORDS]
+
+    frequency = Counter(w for sentence in sentences for w in words(sentence))
+
+    def score(index: int) -> float:
+        terms = words(sentences[index])
+        return sum(frequency[w] for w in terms) / (len(terms) + 1)
+
+    ranked = sorted(range(1, len(sentences)), key=score, reverse=True)
+    chosen = sorted([0] + ranked[:limit - 1])
+    return [sentences[i] for i in chosen]
+
+
+class ContextBuilder:
+    """
+    Running digest of generated sections, kept within a token budget
+
+    Earlier sections are listed by title, using at most half the budget;
+    on long documents only the most recent titles are kept. The rest of the
+    budget goes to key sentences, most recent sections first, so nearby
+    sections keep the most detail and older ones shrink to their titles.
+    """
+
+    def __init__(self, budget_tokens: int = GENERATION_CONTEXT_TOKENS,
+                 points_per_section: int = GENERATION_CONTEXT_KEY_POINTS):
+        self.budget_tokens = budget_tokens
+        self.points_per_section = points_per_section
+        # (title line, title tokens, [(key point, tokens), ...]) per section
+        self._sections: List[Tuple[str, int, List[Tuple[str, int]]]] = []
+
+    def add(self, title: str, content: str) -> None:
+        """Record a finished section; its key points are extracted once here"""
+        points = [(point, count_tokens(point) + 1) for point in key_points(content, self.points_per_section)]
+        line = f"- {title}"
+        self._sections.append((line, count_tokens(line) + 1, points))
+
+    def _fit_titles(self, budget: int) -> Tuple[int, int]:
+        """Number of most recent titles that fit in budget, and the tokens they use"""
+        included = used = 0
+        for _, title_tokens, _ in reversed(self._sections):
+            if used + title_tokens > budget:
+                break
+            used += title_tokens
+            included += 1
+        return included, used
+
+    def build(self) -> str:
+        """Context text for the next section, at most budget_tokens long"""
+        title_budget = self.budget_tokens // 2
+        included, used = self._fit_titles(title_budget)
+        omitted = len(self._sections) - included
+        if omitted:
+            # Make room for the note saying sections were left out
+            note_tokens = count_tokens(self._omitted_note(omitted)) + 1
+            included, used = self._fit_titles(title_budget - note_tokens)
+            omitted = len(self._sections) - included
+            used += note_tokens
+        if not included:
+            return ""
+        remaining = self.budget_tokens - used
+
+        sections = self._sections[len(self._sections) - included:]
+        lines = [[line] for line, _, _ in sections]
+
+        # Spend what is left on key points, newest section first and one
+        # point per section per pass so the budget is shared
+        for depth in range(self.points_per_section):
+            for index in range(len(sections) - 1, -1, -1):
+                points = sections[index][2]
+                if depth >= len(points) or points[depth][1] > remaining:
+                    continue
+                if len(lines[index]) == depth + 1:
+                    lines[index].append(points[depth][0])
+                    remaining -= points[depth][1]
+
+        text = "\n".join(
+            line[0] + (": " + " ".join(line[1:]) if len(line) > 1 else "")
+            for line in lines
+        )
+        if omitted:
+            text = f"{self._omitted_note(omitted)}\n{text}"
+        return f"\n{text}"
+
+    @staticmethod
+    def _omitted_note(count: int) -> str:
+        return f"({count} earlier sections omitted)"
@@ -1,24 +1,31 @@
-from io import BytesIO
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from typing import List, Dict
+from tempfile import SpooledTemporaryFile
+from typing import List, Dict, BinaryIO, Optional
+from app.services.export_cache import EXPORT_SPOOL_MAX_BYTES
 
 
 class DocxService:
     """Service for generating Word documents"""
     
-    def generate_document(self, title: str, sections: List[Dict[str, str]]) -> BytesIO:
+    def generate_document(self, title: str, sections: List[Dict[str, str]],
+                          output: Optional[BinaryIO] = None) -> BinaryIO:
         """
         Generate a .docx file from sections
         
         Args:
             title: Document title
             sections: List of dicts with 'title' and 'content' keys
+            output: Optional writable binary file to save into; defaults to a
+                    SpooledTemporaryFile that stays in memory up to
+                    EXPORT_SPOOL_MAX_BYTES
             
         Returns:
-            BytesIO object containing the document
+            The output file, positioned at the start of the document
         """
+        # python-docx takes a noticeable share of startup, so it is only
+        # imported once something is actually exported
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        
         doc = Document()
         
         # Add title
@@ -39,12 +46,13 @@ class DocxService:
                         para = doc.add_paragraph(para_text.strip())
                         para.paragraph_format.line_spacing = 1.15
         
-        # Save to BytesIO
-        file_stream = BytesIO()
-        doc.save(file_stream)
-        file_stream.seek(0)
+        # Save without holding the whole package in memory
+        if output is None:
+            output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+        doc.save(output)
+        output.seek(0)
         
-        return file_stream
+        return output
 
 
 # Singleton instance
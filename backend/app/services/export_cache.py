@@ -0,0 +1,105 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+from typing import BinaryIO, List, Dict, Optional
+
+# Directory for rendered .docx/.pptx files (Vercel only allows writes to /tmp)
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "ai-docgen-exports")
+)
+
+# Rendered files larger than this spill from memory to a temporary file
+EXPORT_SPOOL_MAX_BYTES = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", str(1024 * 1024)))  # 1 MB
+
+
+def content_hash(title: str, doc_type: str, sections: List[Dict[str, str]]) -> str:
+    """
+    Hash everything that affects a rendered export
+    
+    Args:
+        title: Project title
+        doc_type: Either 'docx' or 'pptx'
+        sections: Ordered list of dicts with 'title' and 'content' keys
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {
+            "title": title,
+            "doc_type": doc_type,
+            "sections": [[s['title'], s.get('content') or ""] for s in sections],
+        },
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """On-disk cache of rendered exports, one current file per project"""
+    
+    def __init__(self, directory: str = EXPORT_CACHE_DIR):
+        self.directory = directory
+    
+    def open(self, project_id: int, digest: str, extension: str) -> Optional[BinaryIO]:
+        """
+        Open the cached file for this revision, or return None
+        
+        The handle stays readable after put() or invalidate() unlinks the
+        file, so a response already under way is never cut off.
+        """
+        try:
+            return open(self._path(project_id, digest, extension), "rb")
+        except FileNotFoundError:
+            return None
+    
+    def temp_path(self) -> str:
+        """
+        Reserve a temporary file inside the cache directory
+        
+        Renderers write here and put() moves the finished file into place,
+        so readers never see a partial export.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix="render-", suffix=".tmp")
+        os.close(fd)
+        return path
+    
+    def put(self, project_id: int, digest: str, extension: str, source_path: str) -> str:
+        """
+        Store a rendered export and drop older revisions of the project
+        
+        Args:
+            project_id: Project the export belongs to
+            digest: content_hash of the project
+            extension: Either 'docx' or 'pptx'
+            source_path: Finished file from temp_path(); it is moved, not copied
+            
+        Returns:
+            Path of the cached file
+        """
+        path = self._path(project_id, digest, extension)
+        os.replace(source_path, path)
+        
+        self.invalidate(project_id, keep=path)
+        return path
+    
+    def invalidate(self, project_id: int, keep: Optional[str] = None) -> None:
+        """Remove cached exports of a project, except keep if given"""
+        for path in glob.glob(os.path.join(self.directory, f"{project_id}-*")):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    
+    def _path(self, project_id: int, digest: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{project_id}-{digest}.{extension}")
+
+
+# Singleton instance
+export_cache = ExportCache()
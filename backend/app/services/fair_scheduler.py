@@ -0,0 +1,186 @@
+import os
+import enum
+import time
+import asyncio
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS
+
+# Upstream LLM calls one user may have in flight at once; 0 disables the cap
+GENERATION_USER_MAX_CONCURRENCY = int(os.getenv("GENERATION_USER_MAX_CONCURRENCY", "4"))
+# Call slots that bulk generation may never take, kept free for interactive requests
+GENERATION_INTERACTIVE_RESERVED = int(os.getenv("GENERATION_INTERACTIVE_RESERVED", "1"))
+
+
+class Priority(str, enum.Enum):
+    INTERACTIVE = "interactive"  # A user is waiting on the answer: outlines, refinements
+    BULK = "bulk"                # Whole-document generation and background jobs
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Who an LLM call is made for, and how urgently"""
+    user_id: Optional[int]
+    priority: Priority = Priority.INTERACTIVE
+
+
+# Set per request by the generation routes and per job by the job service.
+# Calls made without one (scripts, benchmarks) share an uncapped tenant.
+current_tenant: ContextVar[Optional[Tenant]] = ContextVar("current_tenant", default=None)
+_ANONYMOUS = Tenant(user_id=None)
+
+
+@dataclass(frozen=True)
+class Ticket:
+    """A call's place in the fair order, fixed when the call arrives"""
+    tenant: Tenant
+    start_tag: float
+    seq: int
+
+    @property
+    def order(self) -> Tuple[bool, float, int]:
+        """Sort key: interactive calls first, then by start tag"""
+        return (self.tenant.priority is not Priority.INTERACTIVE, self.start_tag, self.seq)
+
+
+class _Waiter:
+    __slots__ = ("ticket", "future", "queued_at")
+
+    def __init__(self, ticket: Ticket, future: asyncio.Future):
+        self.ticket = ticket
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class FairScheduler:
+    """
+    Hands out a fixed number of LLM call slots fairly across users
+
+    Each call first takes a ticket, then waits for rate-limit quota in
+    ticket order, and only then for a slot, so a throttled call never
+    holds a slot. Waiting calls are ordered by priority first, so an interactive call
+    always goes ahead of bulk ones, and then by start-time fair queuing
+    within a priority: each user's calls are tagged with a virtual start
+    time that advances by the call's cost (its prompt tokens), and the
+    lowest tag runs next. A user sending many or large prompts therefore
+    gets the same share of slots as one sending a few, rather than the
+    whole pool, and a newly arriving user starts at the current virtual
+    time instead of behind the backlog.
+
+    A user never holds more than `per_user` slots, and bulk calls leave
+    `reserved` slots free so refinements do not wait behind a long
+    document. Idle capacity is always handed out when some waiting call
+    is allowed to use it.
+    """
+
+    def __init__(self, capacity: int, per_user: int = GENERATION_USER_MAX_CONCURRENCY,
+                 reserved: int = GENERATION_INTERACTIVE_RESERVED):
+        self.capacity = max(1, capacity)
+        self.per_user = per_user
+        # With a single slot nothing can be held back
+        self.reserved = max(0, min(reserved, self.capacity - 1))
+        self.active = 0
+        self._active_by_user: Counter = Counter()
+        self._waiters: List[_Waiter] = []
+        # Virtual time: start tag of the call dispatched most recently
+        self._virtual = 0.0
+        # Virtual finish tag of each user's latest call
+        self._finish: Dict[Optional[int], float] = {}
+        self._seq = itertools.count()
+
+    def ticket(self, cost: float = 1.0, tenant: Optional[Tenant] = None) -> Ticket:
+        """
+        Place a new call in the fair order
+
+        The ticket's order is also used by the rate limiter, so quota is
+        granted in the same order as slots.
+
+        Args:
+            cost: Relative size of the call, e.g. its prompt tokens
+            tenant: Who the call is for; defaults to current_tenant
+        """
+        tenant = tenant or current_tenant.get() or _ANONYMOUS
+        start_tag = max(self._virtual, self._finish.get(tenant.user_id, 0.0))
+        self._finish[tenant.user_id] = start_tag + max(1.0, cost)
+        return Ticket(tenant, start_tag, next(self._seq))
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket) -> AsyncIterator[None]:
+        """Hold one call slot for the duration of the block"""
+        await self._acquire(ticket)
+        try:
+            yield
+        finally:
+            self._release(ticket.tenant)
+
+    def stats(self) -> Dict[str, object]:
+        """Active slots and waiting calls per priority"""
+        waiting = Counter(w.ticket.tenant.priority.value for w in self._waiters)
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "waiting": {priority.value: waiting[priority.value] for priority in Priority},
+        }
+
+    async def _acquire(self, ticket: Ticket) -> None:
+        tenant = ticket.tenant
+        waiter = _Waiter(ticket, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        LLM_QUEUE_DEPTH.inc(priority=tenant.priority.value)
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller was cancelled; give the slot back
+                self._release(tenant)
+            else:
+                self._waiters.remove(waiter)
+                LLM_QUEUE_DEPTH.dec(priority=tenant.priority.value)
+            raise
+
+    def _release(self, tenant: Tenant) -> None:
+        self.active -= 1
+        self._active_by_user[tenant.user_id] -= 1
+        if self._active_by_user[tenant.user_id] <= 0:
+            del self._active_by_user[tenant.user_id]
+            # A finish tag behind the clock no longer affects the user's next
+            # start tag, so it can be dropped
+            if self._finish.get(tenant.user_id, 0.0) <= self._virtual:
+                self._finish.pop(tenant.user_id, None)
+        self._dispatch()
+
+    def _can_start(self, tenant: Tenant) -> bool:
+        if self.active >= self.capacity:
+            return False
+        if tenant.priority is Priority.BULK and self.active >= self.capacity - self.reserved:
+            return False
+        if tenant.user_id is not None and self.per_user > 0 \
+                and self._active_by_user[tenant.user_id] >= self.per_user:
+            return False
+        return True
+
+    def _dispatch(self) -> None:
+        # The queue only holds calls waiting for a slot, at most a few per
+        # in-flight request, so a linear scan is cheap
+        while self._waiters and self.active < self.capacity:
+            # A cancelled waiter stays listed until its caller removes it
+            eligible = [w for w in self._waiters
+                        if not w.future.done() and self._can_start(w.ticket.tenant)]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: w.ticket.order)
+            self._waiters.remove(waiter)
+            self.active += 1
+            self._active_by_user[waiter.ticket.tenant.user_id] += 1
+            self._virtual = max(self._virtual, waiter.ticket.start_tag)
+
+            priority = waiter.ticket.tenant.priority.value
+            LLM_QUEUE_DEPTH.dec(priority=priority)
+            LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - waiter.queued_at, priority=priority)
+            waiter.future.set_result(None)
@@ -0,0 +1,252 @@
+import os
+import enum
+import asyncio
+import logging
+from typing import List, Dict, Optional, AsyncIterator, Callable, Awaitable
+from app.metrics import GENERATION_BATCH_SECTIONS
+from app.services.llm_service import llm_service
+from app.services.context_builder import ContextBuilder, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Default number of sections generated at the same time in outline mode
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))
+# Slides written per LLM call for presentations; 1 asks for each slide separately.
+# Documents default to one section per call since each section is much longer
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", "6"))
+
+
+class ContextMode(str, enum.Enum):
+    CHAINED = "chained"  # Each section sees a key-point digest of the ones before it
+    OUTLINE = "outline"  # Each section sees the full outline, sections run in parallel
+
+
+# Awaited with each section result as soon as it is available
+ResultCallback = Callable[[Dict], Awaitable[None]]
+
+
+class GenerationService:
+    """Service for scheduling content generation across document sections"""
+    
+    def __init__(self, llm=llm_service, concurrency: int = GENERATION_CONCURRENCY,
+                 batch_size: int = GENERATION_BATCH_SIZE):
+        self.llm = llm
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+    
+    async def generate_sections(self, topic: str, doc_type: str, sections: List[Dict],
+                                context_mode: ContextMode = ContextMode.CHAINED,
+                                concurrency: Optional[int] = None,
+                                use_cache: bool = True,
+                                on_result: Optional[ResultCallback] = None,
+                                batch_size: Optional[int] = None) -> List[Dict]:
+        """
+        Generate content for a set of sections
+        
+        Args:
+            topic: Main document topic
+            doc_type: Either 'docx' or 'pptx'
+            sections: List of dicts with 'id', 'title' and 'order_index' keys
+            context_mode: How earlier sections inform later ones
+            concurrency: Max LLM calls in flight at once (outline mode only)
+            use_cache: Set to False to bypass cached LLM responses
+            on_result: Optional coroutine function awaited with each
+                       section result as soon as that section finishes
+            batch_size: Sections requested per LLM call; defaults to
+                        GENERATION_BATCH_SIZE for presentations and 1 for
+                        documents. Sections missing from a batched answer
+                        are retried one at a time.
+            
+        Returns:
+            List of dicts with 'section_id', 'content', 'error' and
+            'prompt_tokens' (estimated prompt size, a batch's prompt shared
+            among its sections) keys, in order_index order. A failed
+            section has content None and an error message; it never aborts
+            the rest of the batch.
+        """
+        ordered = sorted(sections, key=lambda s: s['order_index'])
+        if batch_size is None:
+            batch_size = self.batch_size if doc_type == "pptx" else 1
+        batches = [ordered[i:i + max(1, batch_size)] for i in range(0, len(ordered), max(1, batch_size))]
+        
+        if context_mode == ContextMode.OUTLINE:
+            return await self._generate_with_outline(
+                topic, doc_type, batches, concurrency or self.concurrency, use_cache, on_result
+            )
+        return await self._generate_chained(topic, doc_type, batches, use_cache, on_result)
+    
+    async def _generate_section(self, topic: str, doc_type: str, section: Dict,
+                                context: str = "", outline: Optional[List[str]] = None,
+                                use_cache: bool = True,
+                                on_result: Optional[ResultCallback] = None) -> Dict:
+        prompt_tokens = self._prompt_tokens(topic, doc_type, section, context, outline)
+        try:
+            content = await self.llm.generate_content(
+                topic=topic,
+                section_title=section['title'],
+                doc_type=doc_type,
+                context=context,
+                outline=outline,
+                use_cache=use_cache
+            )
+            result = {"section_id": section['id'], "content": content, "error": None,
+                      "prompt_tokens": prompt_tokens}
+        except Exception as e:
+            logger.warning("Error generating section %s: %s", section['id'], e)
+            result = {"section_id": section['id'], "content": None, "error": str(e),
+                      "prompt_tokens": prompt_tokens}
+        
+        if on_result is not None:
+            await on_result(result)
+        return result
+    
+    async def _generate_batch(self, topic: str, doc_type: str, batch: List[Dict],
+                              context: str = "", outline: Optional[List[str]] = None,
+                              use_cache: bool = True,
+                              on_result: Optional[ResultCallback] = None) -> List[Dict]:
+        if len(batch) == 1:
+            return [await self._generate_section(
+                topic, doc_type, batch[0], context=context, outline=outline,
+                use_cache=use_cache, on_result=on_result
+            )]
+        
+        titles = [section['title'] for section in batch]
+        prompt_tokens = count_tokens(self.llm.batch_prompt(topic, titles, doc_type, context, outline))
+        try:
+            contents = await self.llm.generate_batch(
+                topic=topic,
+                section_titles=titles,
+                doc_type=doc_type,
+                context=context,
+                outline=outline,
+                use_cache=use_cache
+            )
+        except Exception as e:
+            logger.warning("Error generating batch of %d sections: %s", len(batch), e)
+            contents = {}
+        
+        results: List[Optional[Dict]] = [None] * len(batch)
+        for index, content in contents.items():
+            results[index] = {"section_id": batch[index]['id'], "content": content, "error": None,
+                              "prompt_tokens": round(prompt_tokens / len(batch))}
+            if on_result is not None:
+                await on_result(results[index])
+        GENERATION_BATCH_SECTIONS.inc(len(contents), result="batched")
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            logger.info("Batch answer missed %d of %d sections; generating them separately",
+                        len(missing), len(batch))
+            GENERATION_BATCH_SECTIONS.inc(len(missing), result="fallback")
+        for index in missing:
+            results[index] = await self._generate_section(
+                topic, doc_type, batch[index], context=context, outline=outline,
+                use_cache=use_cache, on_result=on_result
+            )
+        return results
+    
+    def _prompt_tokens(self, topic: str, doc_type: str, section: Dict,
+                       context: str, outline: Optional[List[str]]) -> int:
+        prompt = self.llm.content_prompt(topic, section['title'], doc_type, context, outline)
+        tokens = count_tokens(prompt)
+        logger.debug("Section %s prompt is about %d tokens", section['id'], tokens)
+        return tokens
+    
+    async def _generate_chained(self, topic: str, doc_type: str, batches: List[List[Dict]],
+                                use_cache: bool, on_result: Optional[ResultCallback]) -> List[Dict]:
+        results = []
+        context = ContextBuilder()
+        
+        for batch in batches:
+            batch_results = await self._generate_batch(
+                topic, doc_type, batch,
+                context=context.build(),
+                use_cache=use_cache,
+                on_result=on_result
+            )
+            results.extend(batch_results)
+            
+            # Add to context for next batch
+            for section, result in zip(batch, batch_results):
+                if result['content']:
+                    context.add(section['title'], result['content'])
+        
+        return results
+    
+    async def _generate_with_outline(self, topic: str, doc_type: str, batches: List[List[Dict]],
+                                     concurrency: int, use_cache: bool,
+                                     on_result: Optional[ResultCallback]) -> List[Dict]:
+        outline = [section['title'] for batch in batches for section in batch]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def run(batch: List[Dict]) -> List[Dict]:
+            async with semaphore:
+                return await self._generate_batch(
+                    topic, doc_type, batch, outline=outline,
+                    use_cache=use_cache, on_result=on_result
+                )
+        
+        # gather preserves input order, so results stay in order_index order
+        batch_results = await asyncio.gather(*[run(batch) for batch in batches])
+        return [result for results in batch_results for result in results]
+    
+    async def stream_sections(self, topic: str, doc_type: str, sections: List[Dict],
+                              context_mode: ContextMode = ContextMode.CHAINED,
+                              use_cache: bool = True) -> AsyncIterator[Dict]:
+        """
+        Stream content for a set of sections, one section at a time
+        
+        Args:
+            topic: Main document topic
+            doc_type: Either 'docx' or 'pptx'
+            sections: List of dicts with 'id', 'title' and 'order_index' keys
+            context_mode: How earlier sections inform later ones
+            use_cache: Set to False to bypass cached LLM responses
+            
+        Yields:
+            Event dicts with an 'event' key of 'section_start', 'delta',
+            'section_end' or 'section_error' plus the event payload.
+            'section_start' carries the estimated prompt size and
+            'section_end' the complete section content.
+        """
+        ordered = sorted(sections, key=lambda s: s['order_index'])
+        outline = [section['title'] for section in ordered] if context_mode == ContextMode.OUTLINE else None
+        builder = ContextBuilder()
+        
+        for section in ordered:
+            context = builder.build() if outline is None else ""
+            yield {"event": "section_start", "section_id": section['id'],
+                   "title": section['title'], "order_index": section['order_index'],
+                   "prompt_tokens": self._prompt_tokens(topic, doc_type, section, context, outline)}
+            
+            parts = []
+            try:
+                async for delta in self.llm.stream_content(
+                    topic=topic,
+                    section_title=section['title'],
+                    doc_type=doc_type,
+                    context=context,
+                    outline=outline,
+                    use_cache=use_cache
+                ):
+                    parts.append(delta)
+                    yield {"event": "delta", "section_id": section['id'], "text": delta}
+            except Exception as e:
+                logger.warning("Error streaming section %s: %s", section['id'], e)
+                yield {"event": "section_error", "section_id": section['id'], "error": str(e)}
+                continue
+            
+            content = "".join(parts).strip()
+            if not content:
+                yield {"event": "section_error", "section_id": section['id'],
+                       "error": "The model returned no content"}
+                continue
+            yield {"event": "section_end", "section_id": section['id'], "content": content}
+            
+            # Add to context for next section
+            if outline is None:
+                builder.add(section['title'], content)
+
+
+# Singleton instance
+generation_service = GenerationService()
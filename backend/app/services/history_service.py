@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import RefinementHistory, FeedbackType
+
+# A full snapshot is stored every N entries of a section's history chain,
+# bounding how many deltas a reconstruction has to apply
+HISTORY_KEYFRAME_INTERVAL = int(os.getenv("HISTORY_KEYFRAME_INTERVAL", "10"))
+# zlib level (1-9) for stored history payloads
+HISTORY_COMPRESSION_LEVEL = int(os.getenv("HISTORY_COMPRESSION_LEVEL", "6"))
+
+# Words with their trailing whitespace (plus any leading whitespace); joining
+# the tokens gives back the text
+_TOKEN_RE = re.compile(r"^\s+|\S+\s*")
+
+Revision = Tuple[Optional[str], Optional[str]]
+
+
+def make_delta(reference: str, text: str) -> list:
+    """
+    Encode text relative to a reference text
+
+    The delta is a list of [start, end] token ranges copied from the
+    reference and literal strings for everything else.
+    """
+    reference_tokens = _TOKEN_RE.findall(reference)
+    tokens = _TOKEN_RE.findall(text)
+    matcher = SequenceMatcher(None, reference_tokens, tokens)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(tokens[j1:j2]))
+    return ops
+
+
+def apply_delta(reference: str, ops: list) -> str:
+    """Rebuild a text from its reference and a delta produced by make_delta"""
+    reference_tokens = _TOKEN_RE.findall(reference)
+    return "".join(
+        op if isinstance(op, str) else "".join(reference_tokens[op[0]:op[1]])
+        for op in ops
+    )
+
+
+def encode_entry(previous: Optional[str], new: Optional[str],
+                 reference: Optional[str] = None, keyframe: bool = True) -> bytes:
+    """
+    Encode one history entry as a compressed payload
+
+    Args:
+        previous: Section content before the entry
+        new: Section content after the entry
+        reference: New content of the base entry; previous is stored as a
+            delta against it unless this is a keyframe
+        keyframe: Store previous in full
+
+    Returns:
+        zlib-compressed payload
+    """
+    if previous is None:
+        prev_spec = None
+    elif keyframe:
+        prev_spec = {"k": previous}
+    else:
+        prev_spec = {"d": make_delta(reference or "", previous)}
+
+    # New content is always a delta against previous content of the same
+    # entry, so feedback entries (new == previous) cost a single range
+    new_spec = None if new is None else {"d": make_delta(previous or "", new)}
+
+    raw = json.dumps({"p": prev_spec, "n": new_spec}, separators=(",", ":"))
+    return zlib.compress(raw.encode(), HISTORY_COMPRESSION_LEVEL)
+
+
+def decode_entry(payload: bytes, reference: Optional[str] = None) -> Revision:
+    """Decode a payload produced by encode_entry into (previous, new)"""
+    data = json.loads(zlib.decompress(payload))
+
+    prev_spec = data["p"]
+    if prev_spec is None:
+        previous = None
+    elif "k" in prev_spec:
+        previous = prev_spec["k"]
+    else:
+        previous = apply_delta(reference or "", prev_spec["d"])
+
+    new = None if data["n"] is None else apply_delta(previous or "", data["n"]["d"])
+    return previous, new
+
+
+def resolve_entry(entry_id: int, rows: Dict[int, Tuple[Optional[int], bytes]]) -> Revision:
+    """
+    Reconstruct an entry from the rows of its chain
+
+    Args:
+        entry_id: Entry to reconstruct
+        rows: Map of id to (base_id, payload) covering the entry, its
+            keyframe and every entry between them
+
+    Returns:
+        Tuple of (previous content, new content)
+    """
+    path = []
+    current = entry_id
+    while current is not None:
+        path.append(current)
+        current = rows[current][0]
+
+    reference = None
+    revision = (None, None)
+    for row_id in reversed(path):
+        revision = decode_entry(rows[row_id][1], reference)
+        reference = revision[1]
+    return revision
+
+
+def encode_history(entries: Sequence[Tuple[int, Optional[str], Optional[str]]],
+                   keyframe_interval: int = HISTORY_KEYFRAME_INTERVAL) -> List[Dict]:
+    """
+    Encode consecutive entries of one section as a single chain
+
+    Args:
+        entries: (id, previous content, new content) in creation order
+        keyframe_interval: Entries per keyframe
+
+    Returns:
+        Column values for each entry: id, payload, base_id, keyframe_id
+        and chain_length
+    """
+    encoded = []
+    base = None
+    for entry_id, previous, new in entries:
+        if base is None or base["chain_length"] + 1 >= keyframe_interval:
+            values = {
+                "id": entry_id,
+                "payload": encode_entry(previous, new),
+                "base_id": None,
+                "keyframe_id": None,
+                "chain_length": 0,
+            }
+        else:
+            values = {
+                "id": entry_id,
+                "payload": encode_entry(previous, new, base["new"], keyframe=False),
+                "base_id": base["id"],
+                "keyframe_id": base["keyframe_id"] or base["id"],
+                "chain_length": base["chain_length"] + 1,
+            }
+        encoded.append(values)
+        base = {**values, "new": new}
+    return encoded
+
+
+class HistoryService:
+    """Service for storing and reconstructing section refinement history"""
+
+    def __init__(self, keyframe_interval: int = HISTORY_KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+
+    async def record(self, db: AsyncSession, section_id: int,
+                     previous_content: Optional[str], new_content: Optional[str],
+                     prompt: Optional[str] = None,
+                     feedback: FeedbackType = FeedbackType.NONE,
+                     comment: Optional[str] = None) -> RefinementHistory:
+        """
+        Add a history entry for a section, encoded against the latest entry
+
+        The entry is added to the session; the caller commits.
+
+        Args:
+            db: Database session
+            section_id: Section the entry belongs to
+            previous_content: Content before the change
+            new_content: Content after the change
+            prompt: Refinement prompt, if any
+            feedback: Feedback given, if any
+            comment: Feedback comment, if any
+
+        Returns:
+            The new history entry
+        """
+        result = await db.execute(
+            select(RefinementHistory)
+            .where(RefinementHistory.section_id == section_id, RefinementHistory.payload.isnot(None))
+            .order_by(RefinementHistory.id.desc())
+            .limit(1)
+        )
+        base = result.scalar_one_or_none()
+
+        entry = RefinementHistory(
+            section_id=section_id,
+            prompt=prompt,
+            feedback=feedback,
+            comment=comment
+        )
+
+        if base is None or base.chain_length + 1 >= self.keyframe_interval:
+            entry.payload = encode_entry(previous_content, new_content)
+            entry.chain_length = 0
+        else:
+            # Concurrent entries may share a base; each points at its own,
+            # so every chain stays reconstructable
+            _, reference = await self.reconstruct(db, base)
+            entry.payload = encode_entry(previous_content, new_content, reference, keyframe=False)
+            entry.base_id = base.id
+            entry.keyframe_id = base.keyframe_id or base.id
+            entry.chain_length = base.chain_length + 1
+
+        db.add(entry)
+        return entry
+
+    async def reconstruct(self, db: AsyncSession, entry: RefinementHistory) -> Revision:
+        """
+        Rebuild the previous and new content of a history entry
+
+        Args:
+            db: Database session
+            entry: History entry
+
+        Returns:
+            Tuple of (previous content, new content)
+        """
+        if entry.payload is None:
+            # Row written before history compaction
+            return entry.previous_content, entry.new_content
+
+        if entry.base_id is None:
+            return decode_entry(entry.payload)
+
+        # The whole chain lies between the keyframe and the entry
+        result = await db.execute(
+            select(RefinementHistory.id, RefinementHistory.base_id, RefinementHistory.payload)
+            .where(
+                RefinementHistory.section_id == entry.section_id,
+                RefinementHistory.id >= entry.keyframe_id,
+                RefinementHistory.id < entry.id
+            )
+        )
+        rows = {row.id: (row.base_id, row.payload) for row in result}
+        rows[entry.id] = (entry.base_id, entry.payload)
+        return resolve_entry(entry.id, rows)
+
+
+# Singleton instance
+history_service = HistoryService()
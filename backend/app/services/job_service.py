@@ -0,0 +1,381 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.database import AsyncSessionLocal
+from app.models import Project, DocumentSection, GenerationJob, GenerationJobItem, JobStatus
+from app.services.generation_service import generation_service, ContextMode
+from app.services.section_writer import mark_section
+from app.services.fair_scheduler import Priority, Tenant, current_tenant
+
+# Number of jobs processed at the same time by this worker (0 disables the pool)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Seconds between checks for jobs submitted by other processes
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Seconds a claim on a running job stays valid without a heartbeat; the
+# owner renews it every third of that
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobService:
+    """
+    In-process worker pool for persisted document generation jobs
+
+    Several processes may share the queue. A worker claims a job by
+    recording its id and a lease on it, and keeps renewing the lease while
+    the job runs. A job whose lease expired, because its worker died, is
+    claimed again by any worker and resumed; sections that already
+    finished are skipped.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, session_factory=AsyncSessionLocal,
+                 generator=generation_service, poll_interval: float = JOB_POLL_INTERVAL,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.workers = workers
+        self.session_factory = session_factory
+        self.generator = generator
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[int, asyncio.Task] = {}
+        self._cancelling: Set[int] = set()
+        # Jobs whose lease another worker took over; they stop without writing
+        self._lost: Set[int] = set()
+        self._wake: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Start the worker tasks"""
+        if self._tasks or self.workers <= 0:
+            return
+
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the worker tasks and hand their running jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Other workers can resume them right away instead of waiting for
+        # the leases to expire
+        async with self.session_factory() as db:
+            await db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.status == JobStatus.RUNNING,
+                       GenerationJob.worker_id == self.worker_id)
+                .values(status=JobStatus.QUEUED, worker_id=None, lease_expires_at=None)
+            )
+            await db.commit()
+
+    async def submit(self, db: AsyncSession, user_id: int, project: Project,
+                     context_mode: ContextMode = ContextMode.CHAINED,
+                     concurrency: Optional[int] = None, use_cache: bool = True) -> GenerationJob:
+        """
+        Persist a new generation job for every section of a project
+
+        Args:
+            db: Database session
+            user_id: Owner of the job
+            project: Project whose sections are generated, sections loaded
+            context_mode: How earlier sections inform later ones
+            concurrency: Max sections in flight at once (outline mode only)
+            use_cache: Set to False to bypass cached LLM responses
+
+        Returns:
+            The queued job
+        """
+        sections = sorted(project.sections, key=lambda s: s.order_index)
+        job = GenerationJob(
+            user_id=user_id,
+            project_id=project.id,
+            context_mode=context_mode.value,
+            concurrency=concurrency,
+            use_cache=use_cache,
+            total_sections=len(sections),
+            items=[
+                GenerationJobItem(section_id=s.id, order_index=s.order_index)
+                for s in sections
+            ]
+        )
+        db.add(job)
+        await db.commit()
+
+        if self._wake is not None:
+            self._wake.set()
+        return await self.load_job(db, job.id)
+
+    async def load_job(self, db: AsyncSession, job_id: int,
+                       user_id: Optional[int] = None) -> Optional[GenerationJob]:
+        """
+        Load a job with its items, replacing any stale copy in the session
+
+        Args:
+            db: Database session
+            job_id: Job to load
+            user_id: If given, only a job owned by this user is returned
+
+        Returns:
+            The job, or None if it does not exist
+        """
+        query = (
+            select(GenerationJob)
+            .options(selectinload(GenerationJob.items))
+            .where(GenerationJob.id == job_id)
+            .execution_options(populate_existing=True)
+        )
+        if user_id is not None:
+            query = query.where(GenerationJob.user_id == user_id)
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def request_cancel(self, db: AsyncSession, job: GenerationJob) -> GenerationJob:
+        """
+        Cancel a job
+
+        Queued jobs are cancelled immediately. Running jobs stop after the
+        sections currently in flight; their finished sections are kept.
+        """
+        if job.status in TERMINAL_STATUSES:
+            return job
+
+        job.cancel_requested = True
+        if job.status == JobStatus.QUEUED:
+            self._finish(job, JobStatus.CANCELLED)
+        await db.commit()
+
+        self._cancel_running(job.id)
+        return await self.load_job(db, job.id)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job_id = await self._claim_next()
+            except Exception:
+                # A locked database or dropped connection must not end the
+                # worker; try again on the next poll
+                logger.exception("Error claiming the next generation job")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job_id is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception("Error running generation job %s", job_id)
+                try:
+                    await self._mark_failed(job_id, str(e))
+                except Exception:
+                    # The lease runs out and the job is claimed again
+                    logger.exception("Error marking generation job %s failed", job_id)
+                    await asyncio.sleep(self.poll_interval)
+
+    def _claimable(self, now: datetime):
+        """Queued jobs, and running jobs whose worker stopped renewing its lease"""
+        return or_(
+            GenerationJob.status == JobStatus.QUEUED,
+            and_(
+                GenerationJob.status == JobStatus.RUNNING,
+                or_(GenerationJob.lease_expires_at.is_(None), GenerationJob.lease_expires_at < now)
+            )
+        )
+
+    async def _claim_next(self) -> Optional[int]:
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            candidates = (await db.execute(
+                select(GenerationJob.id, GenerationJob.status)
+                .where(self._claimable(now))
+                .order_by(GenerationJob.created_at, GenerationJob.id)
+                .limit(self.workers)
+            )).all()
+
+            for job_id, job_status in candidates:
+                # Conditional update so two workers never claim the same job
+                result = await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id == job_id, self._claimable(now))
+                    .values(
+                        status=JobStatus.RUNNING,
+                        worker_id=self.worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        started_at=func.coalesce(GenerationJob.started_at, now)
+                    )
+                )
+                await db.commit()
+                if result.rowcount:
+                    if job_status == JobStatus.RUNNING:
+                        logger.warning("Resuming generation job %s after its worker's lease expired", job_id)
+                    return job_id
+            return None
+
+    async def _heartbeat(self, job_id: int) -> None:
+        """Renew the lease on a running job until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.session_factory() as db:
+                    result = await db.execute(
+                        update(GenerationJob)
+                        .where(GenerationJob.id == job_id,
+                               GenerationJob.status == JobStatus.RUNNING,
+                               GenerationJob.worker_id == self.worker_id)
+                        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await db.commit()
+            except Exception:
+                # Try again on the next beat; the lease outlasts a few misses
+                logger.exception("Error renewing the lease on generation job %s", job_id)
+                continue
+            if not result.rowcount:
+                # Another worker claimed the job after our lease ran out
+                logger.warning("Lost the lease on generation job %s; stopping it here", job_id)
+                self._lost.add(job_id)
+                task = self._running.get(job_id)
+                if task is not None:
+                    task.cancel()
+                return
+
+    async def _run(self, job_id: int) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        async with self.session_factory() as db:
+            try:
+                await self._run_job(db, job_id)
+            finally:
+                heartbeat.cancel()
+                self._running.pop(job_id, None)
+                self._cancelling.discard(job_id)
+                self._lost.discard(job_id)
+
+    async def _run_job(self, db: AsyncSession, job_id: int) -> None:
+        result = await db.execute(
+            select(GenerationJob)
+            .options(
+                selectinload(GenerationJob.items),
+                selectinload(GenerationJob.project).selectinload(Project.sections)
+            )
+            .where(GenerationJob.id == job_id)
+        )
+        job = result.scalar_one()
+        if job.cancel_requested:
+            self._finish(job, JobStatus.CANCELLED)
+            await db.commit()
+            return
+
+        project = job.project
+        pending = {
+            item.section_id: item for item in job.items
+            if item.status not in TERMINAL_STATUSES
+        }
+        sections = [
+            {"id": s.id, "title": s.title, "order_index": s.order_index}
+            for s in project.sections if s.id in pending
+        ]
+
+        # Results arrive concurrently in outline mode; a session is not
+        # safe for concurrent use
+        lock = asyncio.Lock()
+
+        async def write(result: Dict) -> None:
+            async with lock:
+                item = pending[result['section_id']]
+                # Already in the session, loaded with the project
+                mark_section(await db.get(DocumentSection, result['section_id']), result)
+                if result['error'] is None:
+                    item.status = JobStatus.COMPLETED
+                    job.completed_sections += 1
+                else:
+                    item.status = JobStatus.FAILED
+                    item.error = result['error']
+                    job.failed_sections += 1
+                await db.commit()
+
+                # Pick up cancellations made through another process
+                await db.refresh(job, attribute_names=["cancel_requested"])
+                if job.cancel_requested:
+                    self._cancel_running(job_id)
+
+        async def record(result: Dict) -> None:
+            # Shielded so cancelling the job never interrupts a commit
+            await asyncio.shield(write(result))
+
+        # The task copies the current context, so its LLM calls are
+        # scheduled as bulk work of the job's owner
+        token = current_tenant.set(Tenant(user_id=job.user_id, priority=Priority.BULK))
+        task = asyncio.create_task(self.generator.generate_sections(
+            topic=project.topic or project.title,
+            doc_type=project.doc_type.value,
+            sections=sections,
+            context_mode=ContextMode(job.context_mode),
+            concurrency=job.concurrency,
+            use_cache=job.use_cache,
+            on_result=record
+        ))
+        current_tenant.reset(token)
+        self._running[job_id] = task
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Let a result being written finish before the session is reused
+            async with lock:
+                if job_id in self._lost:
+                    # The worker that took over the job finishes it
+                    return
+                if job_id not in self._cancelling:
+                    # The worker is shutting down; stop() requeues the job
+                    raise
+                await db.rollback()
+                job = await self.load_job(db, job_id)
+                self._finish(job, JobStatus.CANCELLED)
+                await db.commit()
+            return
+
+        self._finish(job, JobStatus.FAILED if job.failed_sections else JobStatus.COMPLETED)
+        await db.commit()
+
+    def _cancel_running(self, job_id: int) -> None:
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelling.add(job_id)
+            task.cancel()
+
+    def _finish(self, job: GenerationJob, status: JobStatus) -> None:
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        for item in job.items:
+            if item.status not in TERMINAL_STATUSES:
+                item.status = JobStatus.CANCELLED if status == JobStatus.CANCELLED else JobStatus.FAILED
+        if status == JobStatus.FAILED and job.error is None and job.failed_sections:
+            job.error = f"{job.failed_sections} of {job.total_sections} sections failed"
+
+    async def _mark_failed(self, job_id: int, error: str) -> None:
+        async with self.session_factory() as db:
+            job = await self.load_job(db, job_id)
+            if job is not None:
+                job.error = error
+                self._finish(job, JobStatus.FAILED)
+                await db.commit()
+
+
+# Singleton instance
+job_service = JobService()
@@ -0,0 +1,245 @@
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(60 * 60 * 24)))  # 1 day
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # 16 MB
+# Optional SQLite file for a second, persistent tier
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "100000"))
+# The disk tier may grow this fraction past its limit before it is trimmed,
+# so the eviction query runs once per batch of writes, not on every write
+_DISK_TRIM_HEADROOM = 0.1
+
+
+def make_cache_key(model_name: str, template_version: str, prompt: str) -> str:
+    """
+    Build a content-addressed cache key
+    
+    Args:
+        model_name: Name of the model that answers the prompt
+        template_version: Version of the prompt templates
+        prompt: Full prompt text; whitespace runs are collapsed first
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    normalized = " ".join(prompt.split())
+    raw = f"{model_name}\x00{template_version}\x00{normalized}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache for LLM responses
+    
+    The async methods serve memory hits inline and run SQLite on a single
+    background thread, so disk lookups and writes never block the event loop.
+    """
+    
+    def __init__(self, ttl: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES, path: Optional[str] = LLM_CACHE_PATH,
+                 disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_entries = disk_max_entries
+        
+        # key -> (expires_at, value)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        # The memory tier stays usable while a disk query holds this one
+        self._disk_lock = threading.Lock()
+        
+        self._hits = 0
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_executor: Optional[ThreadPoolExecutor] = None
+        # Approximate row count; rewritten keys make it an overestimate
+        self._disk_rows = 0
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._disk.commit()
+            self._disk_rows = self._disk.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            # One thread, so disk writes apply in the order they were made
+            self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss"""
+        answered, value = self._get_memory(key)
+        if answered:
+            return value
+        return self._get_disk(key)
+    
+    def set(self, key: str, value: str) -> None:
+        """Store a value under key in every tier"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._set_memory(key, value, expires_at)
+        if self._disk is not None:
+            self._set_disk(key, value, expires_at)
+    
+    async def get_async(self, key: str) -> Optional[str]:
+        """get() with the disk lookup on the cache thread"""
+        answered, value = self._get_memory(key)
+        if answered:
+            return value
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._disk_executor, self._get_disk, key)
+    
+    def set_async(self, key: str, value: str) -> None:
+        """
+        set() that writes the disk tier in the background
+        
+        The memory tier is updated before returning, so the value is served
+        at once; the disk write is queued on the cache thread.
+        """
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._set_memory(key, value, expires_at)
+        if self._disk_executor is not None:
+            self._disk_executor.submit(self._set_disk_logged, key, value, expires_at)
+    
+    def clear(self) -> None:
+        """Remove every entry from every tier"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM llm_cache")
+                self._disk.commit()
+                self._disk_rows = 0
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current memory tier size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._memory),
+                "bytes": self._memory_bytes,
+                "disk_enabled": self._disk is not None,
+            }
+    
+    def _get_memory(self, key: str) -> Tuple[bool, Optional[str]]:
+        # Returns (answered, value); a memory miss is only final without a disk tier
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    self._memory_hits += 1
+                    return True, value
+                self._remove_memory(key)
+            if self._disk is None:
+                self._misses += 1
+                return True, None
+        return False, None
+    
+    def _get_disk(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                value, expires_at = row
+                if expires_at > now:
+                    self._disk.execute(
+                        "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                else:
+                    self._disk.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._disk_rows -= 1
+                self._disk.commit()
+        
+        with self._lock:
+            if row is not None and expires_at > now:
+                # Promote to the memory tier
+                self._set_memory(key, value, expires_at)
+                self._hits += 1
+                self._disk_hits += 1
+                return value
+            self._misses += 1
+            return None
+    
+    def _set_disk(self, key: str, value: str, expires_at: float) -> None:
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+            self._disk_rows += 1
+            if self._disk_rows > self.disk_max_entries * (1 + _DISK_TRIM_HEADROOM):
+                # Drop the least recently used rows beyond the size limit
+                self._disk.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,)
+                )
+                self._disk_rows = self._disk.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            self._disk.commit()
+    
+    def _set_disk_logged(self, key: str, value: str, expires_at: float) -> None:
+        # Nobody awaits a background write, so report failures here
+        try:
+            self._set_disk(key, value, expires_at)
+        except sqlite3.Error:
+            logger.exception("Failed to write LLM cache entry to disk")
+    
+    def _set_memory(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        
+        self._remove_memory(key)
+        self._memory[key] = (expires_at, value)
+        self._memory_bytes += size
+        
+        # Evict least recently used entries until both limits hold
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._remove_memory(oldest)
+            self._evictions += 1
+    
+    def _remove_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1].encode("utf-8"))
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import time
+import math
+import random
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Backend used by the LLM service: "gemini" or "fake"
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
+
+# Fake provider behaviour, for load tests on a box without network access
+# Latency before the first token: "fixed:S", "uniform:LOW,HIGH",
+# "exponential:MEAN" or "lognormal:MEDIAN,SIGMA" (seconds)
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal:0.8,0.5")
+# Output speed after the first token (0 returns the whole response at once)
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "80"))
+# Words in a generated section
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv("FAKE_LLM_RESPONSE_TOKENS", "200"))
+# Fraction of calls that fail after the latency elapses
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# Upstream HTTP statuses meaning "try again later"
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMProvider:
+    """
+    Blocking text generation backend
+
+    LLMService runs provider calls on its own thread pool, so
+    implementations may block.
+    """
+
+    name = "base"
+    model_name = "base"
+
+    def generate(self, prompt: str) -> str:
+        """Return the full response text for a prompt"""
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield response text deltas; defaults to a single delta"""
+        yield self.generate(prompt)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failed call is worth retrying (quota or transient server errors)"""
+        return False
+
+
+# Provider factories by name
+PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {}
+
+
+def register_provider(name: str):
+    """Class decorator adding a provider to the registry under a name"""
+    def decorator(factory):
+        PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+
+def create_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    """
+    Instantiate a registered provider
+
+    Args:
+        name: Registry name, e.g. 'gemini' or 'fake'
+
+    Returns:
+        Provider instance
+    """
+    try:
+        factory = PROVIDERS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of: {', '.join(sorted(PROVIDERS))}")
+    return factory()
+
+
+@register_provider("gemini")
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the google-generativeai client"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL, api_key: Optional[str] = None):
+        # Imported here so processes that never call Gemini skip the client's import cost
+        import google.generativeai as genai
+
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
+        else:
+            logger.warning("GEMINI_API_KEY not found in environment variables")
+
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+    def is_retryable(self, error: Exception) -> bool:
+        # google.api_core exceptions carry the HTTP status as `code`:
+        # 429 ResourceExhausted, 500 InternalServerError, 503 ServiceUnavailable, ...
+        return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+class FakeProviderError(RuntimeError):
+    """Injected failure from the fake provider, standing in for a 503"""
+
+
+def parse_latency(spec: str) -> Tuple[str, Tuple[float, ...]]:
+    """Parse a latency distribution spec such as 'uniform:0.2,1.5'"""
+    kind, _, params = spec.partition(":")
+    values = tuple(float(v) for v in params.split(",") if v.strip())
+    expected = {"fixed": 1, "uniform": 2, "exponential": 1, "lognormal": 2}
+    if expected.get(kind) != len(values):
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    return kind, values
+
+
+_WORDS = (
+    "the a of and to in for with on that this by as is are can will should "
+    "system data model process user team market product strategy growth "
+    "analysis design quality value result approach solution platform "
+    "performance customer research development management framework "
+    "improves enables supports reduces delivers requires provides drives "
+    "clear effective scalable reliable modern significant practical key"
+).split()
+
+
+@register_provider("fake")
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in for a real model, for load and latency testing
+
+    Responses are a deterministic function of the prompt; batched prompts
+    get a JSON object with a response per requested title. Latency is drawn
+    from a seeded distribution, tokens are emitted at a fixed rate, and a
+    configurable fraction of calls fails.
+    """
+
+    name = "fake"
+    model_name = "fake"
+
+    def __init__(self, latency: str = FAKE_LLM_LATENCY,
+                 tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND,
+                 response_tokens: int = FAKE_LLM_RESPONSE_TOKENS,
+                 failure_rate: float = FAKE_LLM_FAILURE_RATE,
+                 seed: int = FAKE_LLM_SEED, sleep: Callable[[float], None] = time.sleep):
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.failure_rate = failure_rate
+        self.sleep = sleep
+        self.calls = 0
+
+        # Calls arrive from several executor threads
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self) -> Tuple[float, bool]:
+        """Draw this call's latency and whether it fails"""
+        kind, params = self.latency
+        with self._lock:
+            self.calls += 1
+            rng = self._random
+            if kind == "fixed":
+                latency = params[0]
+            elif kind == "uniform":
+                latency = rng.uniform(*params)
+            elif kind == "exponential":
+                latency = rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+            else:
+                latency = rng.lognormvariate(math.log(params[0]), params[1]) if params[0] > 0 else 0.0
+            fails = rng.random() < self.failure_rate
+        return latency, fails
+
+    def _response(self, prompt: str) -> str:
+        """Deterministic response text for a prompt"""
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+
+        # Outline prompts ask for N headings, one per line
+        match = re.search(r"Generate (\d+) (?:section headings|slide titles)", prompt)
+        if match:
+            return "\n".join(
+                " ".join(rng.choice(_WORDS) for _ in range(3)).title()
+                for _ in range(int(match.group(1)))
+            )
+
+        # Batched prompts list numbered titles and want a JSON object back
+        if "Return ONLY a JSON object" in prompt:
+            titles = re.findall(r"^\d+\. (.+)$", prompt.split("Write content for each of these", 1)[-1], re.MULTILINE)
+            return json.dumps({title: self._paragraphs(rng) for title in titles})
+
+        return self._paragraphs(rng)
+
+    def _paragraphs(self, rng: random.Random) -> str:
+        words = [rng.choice(_WORDS) for _ in range(self.response_tokens)]
+        sentences = [" ".join(words[i:i + 15]).capitalize() + "." for i in range(0, len(words), 15)]
+        return " ".join(sentences)
+
+    def _start(self) -> None:
+        latency, fails = self._draw()
+        self.sleep(latency)
+        if fails:
+            raise FakeProviderError("Injected fake provider failure")
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, FakeProviderError)
+
+    def generate(self, prompt: str) -> str:
+        self._start()
+        text = self._response(prompt)
+        if self.tokens_per_second > 0:
+            self.sleep(len(text.split()) / self.tokens_per_second)
+        return text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        self._start()
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for word in re.findall(r"\S+\s*", self._response(prompt)):
+            if delay:
+                self.sleep(delay)
+            yield word
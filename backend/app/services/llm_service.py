@@ -1,28 +1,291 @@
 import os
-import google.generativeai as genai
-from typing import List, Dict
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import (
+    LLM_REQUEST_SECONDS, LLM_FIRST_TOKEN_SECONDS, LLM_ERRORS, LLM_TOKENS, LLM_PROMPT_TOKENS,
+    LLM_CACHE_REQUESTS, LLM_RETRIES, LLM_RATE_LIMIT_WAIT_SECONDS
+)
+from app.services.context_builder import count_tokens
+from app.services.rate_limiter import RateLimiter
+from app.services.fair_scheduler import FairScheduler, Ticket
+from app.services.llm_providers import LLMProvider, LLM_PROVIDER, create_provider
+from app.services.llm_cache import LLMCache, LLM_CACHE_ENABLED, make_cache_key
+from app.services.single_flight import SingleFlight
+from typing import Any, Callable, List, Dict, Optional, AsyncIterator
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# Upper bound on simultaneous upstream calls per worker
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Seconds to wait for a single model call before giving up
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# Seconds a streamed call may hold its slot from first request to last chunk
+LLM_STREAM_DEADLINE_SECONDS = float(os.getenv("LLM_STREAM_DEADLINE_SECONDS", "300"))
+# Streamed chunks buffered for a slow client before the upstream read pauses
+LLM_STREAM_BUFFER = int(os.getenv("LLM_STREAM_BUFFER", "64"))
+# Retries of calls failing with quota, timeout or transient server errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Backoff before retry n is between half and all of min(max, base * 2^(n-1)) seconds
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+# No retry starts once this many seconds have passed since the first attempt
+LLM_RETRY_DEADLINE = float(os.getenv("LLM_RETRY_DEADLINE", "120"))
+
+# Bump whenever a prompt template changes so stale cached responses are ignored
+PROMPT_TEMPLATE_VERSION = "1"
+
+
+class EmptyResponseError(RuntimeError):
+    """Raised when the model answers with no usable text"""
+
+
+_FENCE_PATTERN = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_NUMBERING_PATTERN = re.compile(r"^\s*(?:section|slide)?\s*\d+\s*[.):-]?\s*", re.IGNORECASE)
+
+
+def _normalize_title(title: str) -> str:
+    title = title.strip().strip('"\'*#').strip()
+    return " ".join(_NUMBERING_PATTERN.sub("", title, count=1).split()).casefold()
+
+
+def _batch_value(value: Any) -> Optional[str]:
+    """Content text from a JSON value, or None if it is not usable"""
+    if isinstance(value, dict):
+        value = value.get("content")
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        value = "\n".join(item.strip() for item in value if item.strip())
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def parse_batch_response(text: str, titles: List[str]) -> Dict[int, str]:
+    """
+    Extract per-section content from a batched JSON response
+    
+    Tolerates markdown fences and text around the JSON object, numbering
+    or case differences in the keys, a wrapping "sections" key, a list of
+    {"title", "content"} objects, and bullet lists given as JSON arrays.
+    Items that cannot be matched to exactly one requested title, or whose
+    content is empty, are left out so the caller can retry them alone.
+    
+    Args:
+        text: Raw model response
+        titles: Section titles in the order they were requested
+        
+    Returns:
+        Mapping of index into titles to content, for the valid items only
+    """
+    text = _FENCE_PATTERN.sub("", text.strip())
+    try:
+        data = json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+    
+    if isinstance(data, dict) and isinstance(data.get("sections"), (dict, list)):
+        data = data["sections"]
+    if isinstance(data, list):
+        items = [
+            (str(item.get("title", "")), item.get("content"))
+            for item in data if isinstance(item, dict)
+        ]
+    elif isinstance(data, dict):
+        items = list(data.items())
+    else:
+        return {}
+    
+    # Titles repeated within the batch cannot be told apart, so they are
+    # never matched
+    positions: Dict[str, Optional[int]] = {}
+    for index, title in enumerate(titles):
+        key = _normalize_title(title)
+        positions[key] = None if key in positions else index
+    
+    contents: Dict[int, str] = {}
+    for key, value in items:
+        index = positions.get(_normalize_title(key))
+        content = _batch_value(value)
+        if index is not None and content is not None and index not in contents:
+            contents[index] = content
+    return contents
 
 
 class LLMService:
-    """Service for interacting with Gemini LLM"""
+    """Service for interacting with the configured LLM provider"""
     
-    def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
-        else:
-            print("Warning: GEMINI_API_KEY not found in environment variables")
+    def __init__(self, provider: Optional[LLMProvider] = None, provider_name: str = LLM_PROVIDER,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS, cache: Optional[LLMCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None, max_retries: int = LLM_MAX_RETRIES,
+                 retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+                 retry_max_delay: float = LLM_RETRY_MAX_DELAY,
+                 retry_deadline: float = LLM_RETRY_DEADLINE,
+                 stream_deadline: float = LLM_STREAM_DEADLINE_SECONDS,
+                 stream_buffer: int = LLM_STREAM_BUFFER):
+        self._provider = provider
+        self.provider_name = provider_name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Shared by every call so throughput tracks the upstream quota
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_deadline = retry_deadline
+        self.stream_deadline = stream_deadline
+        self.stream_buffer = max(1, stream_buffer)
+        self.cache = cache if cache is not None else (LLMCache() if LLM_CACHE_ENABLED else None)
+        # Identical prompts in flight at the same time share one upstream call
+        self.flights = SingleFlight()
+
+        # Provider clients are synchronous, so calls run on a dedicated
+        # bounded pool instead of blocking the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="llm"
+        )
+        # Call slots are shared fairly between users, interactive calls first
+        self.scheduler = FairScheduler(max_concurrency)
+
+    @property
+    def provider(self) -> LLMProvider:
+        # Created on first use, so importing the app never builds a client
+        if self._provider is None:
+            self._provider = create_provider(self.provider_name)
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider: LLMProvider) -> None:
+        self._provider = provider
+
+    async def _admit(self, tokens: int, ticket: Ticket, method: str, doc_type: str) -> None:
+        """Wait for rate limiter quota and record the prompt of a call about to start"""
+        if self.rate_limiter.enabled:
+            waited = await self.rate_limiter.acquire(tokens, ticket.order)
+            LLM_RATE_LIMIT_WAIT_SECONDS.observe(waited, method=method)
+        LLM_TOKENS.inc(tokens, direction="prompt")
+        LLM_PROMPT_TOKENS.observe(tokens, method=method, doc_type=doc_type)
+    
+    def _record_completion(self, text: str) -> None:
+        tokens = count_tokens(text)
+        LLM_TOKENS.inc(tokens, direction="completion")
+        self.rate_limiter.consume(tokens)
+    
+    def _retry_delay(self, error: Exception, attempt: int, started: float) -> Optional[float]:
+        """
+        Backoff before retrying a failed call, or None if it should not be retried
+        
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of the retry about to happen, from 1
+            started: time.monotonic() of the first attempt
+        """
+        if attempt > self.max_retries:
+            return None
+        if not isinstance(error, asyncio.TimeoutError) and not self.provider.is_retryable(error):
+            return None
+        # Equal jitter: waits grow exponentially but callers that failed
+        # together do not retry together
+        cap = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        if time.monotonic() + delay - started > self.retry_deadline:
+            return None
+        return delay
+
+    def _cache_key(self, prompt: str) -> str:
+        return make_cache_key(self.provider.model_name, PROMPT_TEMPLATE_VERSION, prompt)
+
+    async def _generate(self, prompt: str, use_cache: bool = True,
+                        method: str = "generate", doc_type: str = "",
+                        cacheable: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Run a single model call off the event loop
+
+        Concurrent calls with the same prompt are coalesced into one
+        upstream request whose result (or error) every caller receives.
+
+        Args:
+            prompt: Full prompt text
+            use_cache: Whether to read from and write to the response cache
+            method: Metrics label naming the calling operation
+            doc_type: Metrics label, 'docx' or 'pptx'
+            cacheable: Optional check a response must pass to be cached
+
+        Returns:
+            Stripped response text
+
+        Raises:
+            Exception: The last error once retries are exhausted, or a
+                       non-retryable error straight away
+        """
+        key = self._cache_key(prompt)
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.get_async(key)
+            if cached is not None:
+                LLM_CACHE_REQUESTS.inc(result="hit")
+                return cached
+            LLM_CACHE_REQUESTS.inc(result="miss")
+
+        async def attempt() -> str:
+            tokens = count_tokens(prompt)
+            ticket = self.scheduler.ticket(tokens)
+            # Quota is granted in ticket order before a slot is taken, so
+            # throttled calls wait without holding one
+            await self._admit(tokens, ticket, method, doc_type)
+            async with self.scheduler.slot(ticket):
+                loop = asyncio.get_running_loop()
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, self.provider.generate, prompt),
+                        timeout=self.timeout
+                    )
+                except Exception:
+                    LLM_ERRORS.inc(method=method, doc_type=doc_type)
+                    raise
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, doc_type=doc_type)
+            return response
+        
+        async def call() -> str:
+            started = time.monotonic()
+            retries = 0
+            while True:
+                try:
+                    response = await attempt()
+                    break
+                except Exception as e:
+                    retries += 1
+                    delay = self._retry_delay(e, retries, started)
+                    if delay is None:
+                        raise
+                    LLM_RETRIES.inc(method=method, doc_type=doc_type)
+                    logger.info("Retrying %s call in %.1fs after error: %s", method, delay, e)
+                    # Sleeps outside the call slot so other calls can use it
+                    await asyncio.sleep(delay)
             
-        # Use the available model from the user's list
-        self.model = genai.GenerativeModel('models/gemini-2.0-flash')
+            text = response.strip()
+            self._record_completion(text)
+            if use_cache and text and (cacheable is None or cacheable(text)):
+                self.cache.set_async(key, text)
+            return text
+
+        return await self.flights.do(key, call)
     
-    async def generate_outline(self, topic: str, doc_type: str, num_items: int = 5) -> List[str]:
+    async def generate_outline(self, topic: str, doc_type: str, num_items: int = 5,
+                               use_cache: bool = True) -> List[str]:
         """
         Generate an outline for a document based on topic
         
@@ -30,9 +293,13 @@ class LLMService:
             topic: Main topic/prompt
             doc_type: Either 'docx' or 'pptx'
             num_items: Number of sections/slides to generate
+            use_cache: Set to False to bypass cached responses
             
         Returns:
             List of section titles or slide headings
+            
+        Raises:
+            Exception: If the model call fails after retries or returns no headings
         """
         if doc_type == "docx":
             prompt = f"""Generate {num_items} section headings for a professional Word document about: {topic}
@@ -45,22 +312,191 @@ Make them clear, professional, and comprehensive."""
 Return ONLY the slide titles, one per line, without numbering or additional text.
 Make them clear, engaging, and suitable for a presentation."""
         
+        text = await self._generate(prompt, use_cache=use_cache, method="outline", doc_type=doc_type)
+        lines = text.split('\n')
+        # Clean up the lines
+        headings = [line.strip('- ').strip() for line in lines if line.strip()]
+        if not headings:
+            raise EmptyResponseError("The model returned no outline headings")
+        return headings[:num_items]
+    
+    async def _stream(self, prompt: str, use_cache: bool = True,
+                      method: str = "stream", doc_type: str = "") -> AsyncIterator[str]:
+        """
+        Stream a single model call off the event loop
+        
+        The blocking chunk iterator runs on the executor and hands text
+        deltas back to the loop through a bounded queue. The timeout applies
+        to the wait for each chunk; stream_deadline bounds the whole call. The
+        call slot is given back as soon as the model finishes, even while a
+        slow client is still reading the last chunks. A cache hit is
+        yielded as a single delta. Failures before the first delta are
+        retried like _generate; later ones are raised since part of the
+        response has been delivered.
+        
+        Args:
+            prompt: Full prompt text
+            use_cache: Whether to read from and write to the response cache
+            method: Metrics label naming the calling operation
+            doc_type: Metrics label, 'docx' or 'pptx'
+            
+        Yields:
+            Text deltas as the model produces them
+        """
+        key = self._cache_key(prompt) if self.cache is not None and use_cache else None
+        if key is not None:
+            cached = await self.cache.get_async(key)
+            if cached is not None:
+                LLM_CACHE_REQUESTS.inc(result="hit")
+                yield cached
+                return
+            LLM_CACHE_REQUESTS.inc(result="miss")
+        
+        started = time.monotonic()
+        retries = 0
+        while True:
+            parts = []
+            try:
+                attempt = self._stream_attempt(prompt, method, doc_type)
+                try:
+                    async for item in attempt:
+                        parts.append(item)
+                        yield item
+                finally:
+                    # Stops the worker thread at once if our consumer goes away
+                    await attempt.aclose()
+                break
+            except Exception as e:
+                if parts:
+                    raise
+                retries += 1
+                delay = self._retry_delay(e, retries, started)
+                if delay is None:
+                    raise
+                LLM_RETRIES.inc(method=method, doc_type=doc_type)
+                logger.info("Retrying %s stream in %.1fs after error: %s", method, delay, e)
+                await asyncio.sleep(delay)
+        
+        text = "".join(parts).strip()
+        self._record_completion(text)
+        if key is not None and text:
+            self.cache.set_async(key, text)
+    
+    async def _stream_attempt(self, prompt: str, method: str, doc_type: str) -> AsyncIterator[str]:
+        """One rate-limited streaming call, yielding non-empty text deltas"""
+        tokens = count_tokens(prompt)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # The worker thread takes a credit per delta and the consumer hands it
+        # back, so at most stream_buffer deltas wait and a slow client slows
+        # the upstream read instead of growing the queue
+        credits = threading.Semaphore(self.stream_buffer)
+        done = object()
+        stop = threading.Event()
+        granted = asyncio.Event()
+        start = 0.0
+        
+        provider = self.provider
+        
+        def produce():
+            for delta in provider.stream(prompt):
+                credits.acquire()
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, delta)
+        
+        async def pump():
+            # Holds the slot only while the model produces, not while the
+            # consumer drains what is left in the queue
+            nonlocal start
+            try:
+                async with self.scheduler.slot(ticket):
+                    start = time.perf_counter()
+                    granted.set()
+                    await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, produce),
+                        timeout=self.stream_deadline
+                    )
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, doc_type=doc_type)
+                queue.put_nowait(done)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                # Let the worker thread bail out early, waking it if it waits
+                # for a credit
+                stop.set()
+                credits.release()
+        
+        ticket = self.scheduler.ticket(tokens)
+        await self._admit(tokens, ticket, method, doc_type)
+        producer = asyncio.ensure_future(pump())
+        first = True
         try:
-            response = self.model.generate_content(prompt)
-            lines = response.text.strip().split('\n')
-            # Clean up the lines
-            headings = [line.strip('- ').strip() for line in lines if line.strip()]
-            return headings[:num_items]
-        except Exception as e:
-            print(f"Error generating outline: {e}")
-            # Return default outline
-            if doc_type == "docx":
-                return [f"Section {i+1}" for i in range(num_items)]
-            else:
-                return [f"Slide {i+1}" for i in range(num_items)]
+            # The chunk timeout only starts once a slot is held
+            await granted.wait()
+            while True:
+                item = await asyncio.wait_for(queue.get(), timeout=self.timeout)
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                credits.release()
+                if item:
+                    if first:
+                        LLM_FIRST_TOKEN_SECONDS.observe(
+                            time.perf_counter() - start, method=method, doc_type=doc_type
+                        )
+                        first = False
+                    yield item
+        except Exception:
+            LLM_ERRORS.inc(method=method, doc_type=doc_type)
+            raise
+        finally:
+            # Gives the slot back at once if our consumer went away
+            producer.cancel()
+    
+    def content_prompt(self, topic: str, section_title: str, doc_type: str,
+                       context: str = "", outline: Optional[List[str]] = None) -> str:
+        """Prompt sent by generate_content and stream_content for the same arguments"""
+        if outline:
+            outline_text = "\n".join(f"- {title}" for title in outline)
+            context_label = "Full document outline" if doc_type == "docx" else "Full presentation outline"
+            context = f"\n{outline_text}"
+        else:
+            context_label = "Context from previous sections" if doc_type == "docx" else "Context from previous slides"
+
+        if doc_type == "docx":
+            return f"""Topic: {topic}
+Section: {section_title}
+
+Write detailed, professional content for this section of a Word document.
+{f"{context_label}: {context}" if context else ""}
+
+Provide well-structured paragraphs (200-300 words) that are informative and engaging."""
+        else:  # pptx
+            return f"""Topic: {topic}
+Slide Title: {section_title}
+
+Create concise, impactful bullet points for this PowerPoint slide.
+{f"{context_label}: {context}" if context else ""}
+
+Provide 4-6 clear bullet points that effectively communicate key information."""
+    
+    def _refine_prompt(self, current_content: str, refinement_prompt: str,
+                       section_title: str, doc_type: str) -> str:
+        doc_format = "paragraphs" if doc_type == "docx" else "bullet points"
+        
+        return f"""Current content for "{section_title}":
+{current_content}
+
+User wants: {refinement_prompt}
+
+Rewrite the content following the user's instruction while maintaining professional quality.
+Keep the format as {doc_format}. Return ONLY the revised content."""
     
     async def generate_content(self, topic: str, section_title: str, doc_type: str, 
-                               context: str = "") -> str:
+                               context: str = "", outline: Optional[List[str]] = None,
+                               use_cache: bool = True) -> str:
         """
         Generate content for a specific section or slide
         
@@ -69,33 +505,106 @@ Make them clear, engaging, and suitable for a presentation."""
             section_title: Title of the section/slide
             doc_type: Either 'docx' or 'pptx'
             context: Optional context from previous sections
+            outline: Optional full list of section/slide titles, used instead of
+                     context so sections can be generated independently
+            use_cache: Set to False to bypass cached responses
             
         Returns:
             Generated content as string
+            
+        Raises:
+            Exception: If the model call fails after retries or returns
+                       nothing; no placeholder text is ever returned
+        """
+        prompt = self.content_prompt(topic, section_title, doc_type, context, outline)
+        
+        content = await self._generate(prompt, use_cache=use_cache, method="content", doc_type=doc_type)
+        if not content:
+            raise EmptyResponseError(f"The model returned no content for {section_title!r}")
+        return content
+    
+    async def stream_content(self, topic: str, section_title: str, doc_type: str,
+                             context: str = "", outline: Optional[List[str]] = None,
+                             use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Stream content for a specific section or slide
+        
+        Takes the same arguments as generate_content. Errors are raised to
+        the caller instead of being replaced with placeholder text, since
+        part of the response may already have been sent.
+        
+        Yields:
+            Text deltas as the model produces them
         """
+        prompt = self.content_prompt(topic, section_title, doc_type, context, outline)
+        async for delta in self._stream(prompt, use_cache=use_cache, method="stream_content",
+                                        doc_type=doc_type):
+            yield delta
+    
+    def batch_prompt(self, topic: str, section_titles: List[str], doc_type: str,
+                     context: str = "", outline: Optional[List[str]] = None) -> str:
+        """Prompt asking for several sections at once as a JSON object keyed by title"""
+        numbered = "\n".join(f"{i + 1}. {title}" for i, title in enumerate(section_titles))
+        
         if doc_type == "docx":
-            prompt = f"""Topic: {topic}
-Section: {section_title}
-
-Write detailed, professional content for this section of a Word document.
-{f"Context from previous sections: {context}" if context else ""}
-
-Provide well-structured paragraphs (200-300 words) that are informative and engaging."""
+            unit, document = "section", "Word document"
+            outline_label = "Full document outline"
+            instructions = "For each section, write well-structured paragraphs (200-300 words) that are informative and engaging, separated by blank lines."
         else:  # pptx
-            prompt = f"""Topic: {topic}
-Slide Title: {section_title}
+            unit, document = "slide", "PowerPoint presentation"
+            outline_label = "Full presentation outline"
+            instructions = "For each slide, write 4-6 concise, impactful bullet points, one per line."
+        
+        if outline:
+            outline_text = "\n".join(f"- {title}" for title in outline)
+            context_text = f"{outline_label}:\n{outline_text}"
+        elif context:
+            context_text = f"Context from previous {unit}s: {context}"
+        else:
+            context_text = ""
+        
+        return f"""Topic: {topic}
+{context_text}
 
-Create concise, impactful bullet points for this PowerPoint slide.
-{f"Context from previous slides: {context}" if context else ""}
+Write content for each of these {unit}s of a professional {document}:
+{numbered}
 
-Provide 4-6 clear bullet points that effectively communicate key information."""
+{instructions}
+
+Return ONLY a JSON object whose keys are the {unit} titles exactly as written above (without the numbers) and whose values are the content as a string. Do not add markdown fences or any other text."""
+    
+    async def generate_batch(self, topic: str, section_titles: List[str], doc_type: str,
+                             context: str = "", outline: Optional[List[str]] = None,
+                             use_cache: bool = True) -> Dict[int, str]:
+        """
+        Generate content for several sections or slides in one model call
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            print(f"Error generating content: {e}")
-            return f"Content for {section_title} will be generated here."
+        Args:
+            topic: Main document topic
+            section_titles: Titles of the sections to write, in order
+            doc_type: Either 'docx' or 'pptx'
+            context: Optional context from previous sections
+            outline: Optional full list of section/slide titles
+            use_cache: Set to False to bypass cached responses
+            
+        Returns:
+            Mapping of index into section_titles to content. Sections the
+            response did not cover validly are missing; call
+            generate_content for those.
+            
+        Raises:
+            Exception: If the model call itself fails
+        """
+        prompt = self.batch_prompt(topic, section_titles, doc_type, context, outline)
+        
+        # Only cache responses that cover the whole batch, so a bad answer
+        # is not replayed on the next attempt
+        def complete(text: str) -> bool:
+            return len(parse_batch_response(text, section_titles)) == len(section_titles)
+        
+        text = await self._generate(prompt, use_cache=use_cache, method="batch", doc_type=doc_type,
+                                    cacheable=complete)
+        return parse_batch_response(text, section_titles)
     
     async def refine_content(self, current_content: str, refinement_prompt: str, 
                             section_title: str, doc_type: str) -> str:
@@ -110,23 +619,31 @@ Provide 4-6 clear bullet points that effectively communicate key information."""
             
         Returns:
             Refined content as string
+            
+        Raises:
+            Exception: If the model call fails after retries or returns nothing
         """
-        doc_format = "paragraphs" if doc_type == "docx" else "bullet points"
+        prompt = self._refine_prompt(current_content, refinement_prompt, section_title, doc_type)
         
-        prompt = f"""Current content for "{section_title}":
-{current_content}
-
-User wants: {refinement_prompt}
-
-Rewrite the content following the user's instruction while maintaining professional quality.
-Keep the format as {doc_format}. Return ONLY the revised content."""
+        # Refinements are always fresh; asking again should give a new rewrite
+        content = await self._generate(prompt, use_cache=False, method="refine", doc_type=doc_type)
+        if not content:
+            raise EmptyResponseError(f"The model returned no refinement for {section_title!r}")
+        return content
+    
+    async def stream_refine(self, current_content: str, refinement_prompt: str,
+                            section_title: str, doc_type: str) -> AsyncIterator[str]:
+        """
+        Stream refined content for a section
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            print(f"Error refining content: {e}")
-            return current_content  # Return original if refinement fails
+        Takes the same arguments as refine_content and raises on failure.
+        
+        Yields:
+            Text deltas as the model produces them
+        """
+        prompt = self._refine_prompt(current_content, refinement_prompt, section_title, doc_type)
+        async for delta in self._stream(prompt, use_cache=False, method="stream_refine", doc_type=doc_type):
+            yield delta
 
 
 # Singleton instance
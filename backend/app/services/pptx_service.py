@@ -1,24 +1,30 @@
-from io import BytesIO
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from typing import List, Dict
+from tempfile import SpooledTemporaryFile
+from typing import List, Dict, BinaryIO, Optional
+from app.services.export_cache import EXPORT_SPOOL_MAX_BYTES
 
 
 class PptxService:
     """Service for generating PowerPoint presentations"""
     
-    def generate_presentation(self, title: str, slides: List[Dict[str, str]]) -> BytesIO:
+    def generate_presentation(self, title: str, slides: List[Dict[str, str]],
+                              output: Optional[BinaryIO] = None) -> BinaryIO:
         """
         Generate a .pptx file from slides
         
         Args:
             title: Presentation title
             slides: List of dicts with 'title' and 'content' keys
+            output: Optional writable binary file to save into; defaults to a
+                    SpooledTemporaryFile that stays in memory up to
+                    EXPORT_SPOOL_MAX_BYTES
             
         Returns:
-            BytesIO object containing the presentation
+            The output file, positioned at the start of the presentation
         """
+        # Imported on first export to keep python-pptx out of startup
+        from pptx import Presentation
+        from pptx.util import Inches
+        
         prs = Presentation()
         prs.slide_width = Inches(10)
         prs.slide_height = Inches(7.5)
@@ -61,12 +67,13 @@ class PptxService:
                         p.text = line
                         p.level = 0
         
-        # Save to BytesIO
-        file_stream = BytesIO()
-        prs.save(file_stream)
-        file_stream.seek(0)
+        # Save without holding the whole package in memory
+        if output is None:
+            output = SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+        prs.save(output)
+        output.seek(0)
         
-        return file_stream
+        return output
 
 
 # Singleton instance
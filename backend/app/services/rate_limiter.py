@@ -0,0 +1,148 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Callable, List, Tuple
+
+# Upstream quota per minute for this worker; 0 leaves that dimension unlimited
+LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+# Seconds of quota that may be spent in a single burst
+LLM_RATE_LIMIT_BURST_SECONDS = float(os.getenv("LLM_RATE_LIMIT_BURST_SECONDS", "10"))
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to `capacity` units"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = LLM_RATE_LIMIT_BURST_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)"""
+        self._refill()
+        # A request larger than the bucket waits for a full bucket and then
+        # drives the level negative, delaying the requests after it instead
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+class _QuotaWaiter:
+    __slots__ = ("order", "seq", "tokens", "wakeup")
+
+    def __init__(self, order: Tuple, seq: int, tokens: int):
+        self.order = order
+        self.seq = seq
+        self.tokens = tokens
+        self.wakeup = asyncio.Event()
+
+    def __lt__(self, other: "_QuotaWaiter") -> bool:
+        return (self.order, self.seq) < (other.order, other.seq)
+
+
+class RateLimiter:
+    """
+    Request and token quota shared by every LLM call in the process
+
+    Waiting callers are served in `order` (interactive calls first, then
+    their fair-queuing start tag), arrival order breaking ties. Only the
+    caller at the head of the queue waits for the buckets to refill; a
+    more urgent caller arriving meanwhile takes its place. Prompt tokens
+    are charged when a call is admitted and response tokens once they are
+    known, so the token bucket tracks real usage even though response
+    sizes cannot be predicted.
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_RATE_LIMIT_RPM,
+                 tokens_per_minute: int = LLM_RATE_LIMIT_TPM,
+                 burst_seconds: float = LLM_RATE_LIMIT_BURST_SECONDS):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self._waiters: List[_QuotaWaiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _delay(self, tokens: int) -> float:
+        return max(
+            self.requests.delay(1) if self.requests else 0.0,
+            self.tokens.delay(tokens) if self.tokens else 0.0
+        )
+
+    def _wake_head(self) -> None:
+        if self._waiters:
+            self._waiters[0].wakeup.set()
+
+    async def acquire(self, tokens: int = 0, order: Tuple = ()) -> float:
+        """
+        Wait until one request and `tokens` prompt tokens fit in the quota
+
+        Args:
+            tokens: Estimated prompt tokens of the call
+            order: Sort key of the call; lower keys are served first
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+
+        start = time.monotonic()
+        waiter = _QuotaWaiter(order, next(self._seq), tokens)
+        previous_head = self._waiters[0] if self._waiters else None
+        heapq.heappush(self._waiters, waiter)
+        if previous_head is not None and self._waiters[0] is waiter:
+            # The old head goes back to waiting for its turn
+            previous_head.wakeup.set()
+
+        try:
+            while True:
+                wait = None
+                if self._waiters[0] is waiter:
+                    wait = self._delay(tokens)
+                    if wait <= 0:
+                        break
+                waiter.wakeup.clear()
+                try:
+                    await asyncio.wait_for(waiter.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            heapq.heappop(self._waiters)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+        finally:
+            self._wake_head()
+        return time.monotonic() - start
+
+    def consume(self, tokens: int) -> None:
+        """Charge tokens used after admission, such as the response"""
+        if self.tokens:
+            self.tokens.take(tokens)
@@ -0,0 +1,216 @@
+import os
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Set
+from app.metrics import RENDER_SECONDS, RENDER_ERRORS
+from app.services.docx_service import docx_service
+from app.services.pptx_service import pptx_service
+
+# Worker processes for rendering; 0 renders on a thread in this process instead
+EXPORT_RENDER_WORKERS = int(os.getenv("EXPORT_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Renders allowed to wait for a free worker before new ones are rejected
+EXPORT_RENDER_QUEUE = int(os.getenv("EXPORT_RENDER_QUEUE", "8"))
+# Seconds a single render may take
+EXPORT_RENDER_TIMEOUT = float(os.getenv("EXPORT_RENDER_TIMEOUT", "60"))
+
+
+class RenderSaturatedError(Exception):
+    """Raised when every render worker is busy and the queue is full"""
+
+
+def render_document(doc_type: str, title: str, sections: List[Dict[str, str]], path: str) -> int:
+    """
+    Render a document straight to a file
+    
+    Module-level so it can be shipped to a worker process. Only the path
+    and the resulting size cross the process boundary, never the file.
+    
+    Args:
+        doc_type: Either 'docx' or 'pptx'
+        title: Document title
+        sections: List of dicts with 'title' and 'content' keys
+        path: File to write
+        
+    Returns:
+        Size of the rendered file in bytes
+    """
+    with open(path, "wb") as output:
+        if doc_type == "docx":
+            docx_service.generate_document(title=title, sections=sections, output=output)
+        else:  # pptx
+            pptx_service.generate_presentation(title=title, slides=sections, output=output)
+    return os.path.getsize(path)
+
+
+class _Pool:
+    """A worker pool and the renders it still has to answer"""
+    __slots__ = ("executor", "waiting", "retired")
+    
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        # Renders whose caller still waits on them; timed out ones do not count
+        self.waiting = 0
+        # Takes no new renders and is stopped once waiting reaches zero
+        self.retired = False
+
+
+class RenderService:
+    """Runs CPU-bound docx/pptx rendering off the event loop"""
+    
+    def __init__(self, workers: int = EXPORT_RENDER_WORKERS, queue_size: int = EXPORT_RENDER_QUEUE,
+                 timeout: float = EXPORT_RENDER_TIMEOUT):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._pool: Optional[_Pool] = None
+        self._retired: Set[_Pool] = set()
+        # Renders submitted and not yet finished, including abandoned ones
+        self._in_flight = 0
+    
+    @property
+    def capacity(self) -> int:
+        """Renders that may be running or waiting at once"""
+        return max(1, self.workers) + self.queue_size
+    
+    async def render(self, doc_type: str, title: str, sections: List[Dict[str, str]],
+                     path: str) -> int:
+        """
+        Render a document on the worker pool
+        
+        A render counts against the capacity until its worker is done with
+        it, even after a timeout. On a timeout its pool is retired: new
+        renders go to a fresh pool, and the old one is terminated once its
+        other renders finish. If the render fails, times out or the caller
+        goes away, path is removed once no worker writes to it any more.
+        
+        Args:
+            doc_type: Either 'docx' or 'pptx'
+            title: Document title
+            sections: List of dicts with 'title' and 'content' keys
+            path: File to write
+            
+        Returns:
+            Size of the rendered file in bytes
+            
+        Raises:
+            RenderSaturatedError: If the pool and its queue are full
+            asyncio.TimeoutError: If the render exceeds the configured timeout
+        """
+        if self._in_flight >= self.capacity:
+            RENDER_ERRORS.inc(doc_type=doc_type, reason="saturated")
+            _remove(path)
+            raise RenderSaturatedError("All render workers are busy")
+        
+        pool = self._get_pool()
+        future = asyncio.wrap_future(
+            pool.executor.submit(render_document, doc_type, title, sections, path)
+        )
+        self._in_flight += 1
+        pool.waiting += 1
+        # Set once the caller stops waiting, so the file is not wanted
+        abandoned = False
+        expired = False
+        
+        def finished(future: asyncio.Future) -> None:
+            self._in_flight -= 1
+            if not expired:
+                pool.waiting -= 1
+                self._reap(pool)
+            # Also marks the error as retrieved when nobody awaits it any more
+            failed = future.cancelled() or future.exception() is not None
+            if failed or abandoned:
+                _remove(path)
+        
+        future.add_done_callback(finished)
+        
+        start = time.perf_counter()
+        try:
+            # Shielded so a timeout or a departed caller leaves the render
+            # counted until the worker actually stops
+            size = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            RENDER_SECONDS.observe(time.perf_counter() - start, doc_type=doc_type)
+            return size
+        except asyncio.TimeoutError:
+            RENDER_ERRORS.inc(doc_type=doc_type, reason="timeout")
+            abandoned = True
+            if future.done():
+                _remove(path)
+            else:
+                expired = True
+                pool.waiting -= 1
+                self._retire(pool)
+            raise
+        except asyncio.CancelledError:
+            # The caller went away; the render finishes unobserved
+            abandoned = True
+            if future.done():
+                _remove(path)
+            raise
+        except BrokenProcessPool:
+            RENDER_ERRORS.inc(doc_type=doc_type, reason="broken_pool")
+            # A worker died; start a fresh pool for the next render
+            self._retire(pool)
+            raise
+        except Exception:
+            RENDER_ERRORS.inc(doc_type=doc_type, reason="error")
+            raise
+    
+    def shutdown(self) -> None:
+        """Stop the worker pool and any retired ones"""
+        if self._pool is not None:
+            self._pool.executor.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        for pool in list(self._retired):
+            self._stop(pool)
+    
+    def _get_pool(self) -> _Pool:
+        # Created on first export so startup stays cheap
+        if self._pool is None:
+            if self.workers > 0:
+                # spawn avoids forking a process that already runs event loop
+                # and LLM executor threads
+                executor: Executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+            self._pool = _Pool(executor)
+        return self._pool
+    
+    def _retire(self, pool: _Pool) -> None:
+        if self._pool is pool:
+            self._pool = None
+        if not pool.retired:
+            pool.retired = True
+            self._retired.add(pool)
+        self._reap(pool)
+    
+    def _reap(self, pool: _Pool) -> None:
+        # Only renders nobody waits for are left on a retired pool
+        if pool.retired and pool.waiting == 0:
+            self._stop(pool)
+    
+    def _stop(self, pool: _Pool) -> None:
+        self._retired.discard(pool)
+        if isinstance(pool.executor, ProcessPoolExecutor):
+            # The executor has no public way to stop a running task; killing
+            # the workers fails their futures, which releases their renders
+            for process in list((getattr(pool.executor, "_processes", None) or {}).values()):
+                process.terminate()
+        # A render thread cannot be stopped; it finishes in the background
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Singleton instance
+render_service = RenderService()
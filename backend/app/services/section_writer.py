@@ -0,0 +1,74 @@
+import os
+import asyncio
+from typing import Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import DocumentSection, SectionStatus
+
+# Section results persisted per commit, failed ones included, since their
+# status and error are written too (0 commits once when generation ends)
+GENERATION_COMMIT_BATCH = int(os.getenv("GENERATION_COMMIT_BATCH", "5"))
+
+
+def mark_section(section: DocumentSection, result: Dict) -> None:
+    """Apply a generation result: new content, or the failed state and its error"""
+    if result['error'] is None:
+        section.content = result['content']
+        section.status = SectionStatus.GENERATED
+        section.error = None
+    else:
+        section.status = SectionStatus.FAILED
+        section.error = result['error']
+
+
+class SectionWriter:
+    """
+    Writes generated section content back in batched commits
+
+    Results are applied to the already loaded sections in memory and
+    committed every `batch_size` section results, so an N-section
+    document costs about N / batch_size commits instead of N. No transaction
+    stays open between checkpoints, so nothing holds a database lock while
+    the LLM works. Failed sections keep their content and are marked
+    failed with the error, never filled with placeholder text.
+
+    Checkpoint policy: every committed batch is durable. Callers flush() in
+    a finally block so results that arrived before an error, a client
+    disconnect or a cancellation are still saved; only sections that never
+    finished generating are lost.
+    """
+
+    def __init__(self, db: AsyncSession, sections: Dict[int, DocumentSection],
+                 batch_size: int = GENERATION_COMMIT_BATCH):
+        self.db = db
+        self.sections = sections
+        self.batch_size = batch_size
+        self.pending = 0
+        self.commits = 0
+
+        # Results arrive concurrently in outline mode; a session is not
+        # safe for concurrent use
+        self._lock = asyncio.Lock()
+
+    async def add(self, result: Dict) -> None:
+        """
+        Record one section result, committing when the batch is full
+
+        Args:
+            result: Dict with 'section_id', 'content' and 'error' keys
+        """
+        async with self._lock:
+            mark_section(self.sections[result['section_id']], result)
+            self.pending += 1
+            if self.batch_size > 0 and self.pending >= self.batch_size:
+                await self._commit()
+
+    async def flush(self) -> None:
+        """Commit any results not yet persisted"""
+        async with self._lock:
+            if self.pending:
+                await self._commit()
+
+    async def _commit(self) -> None:
+        await self.db.commit()
+        self.commits += 1
+        self.pending = 0
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one upstream call"""
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+        
+        Every waiter receives the same result or the same exception. A
+        cancelled waiter only stops waiting; the shared call keeps running
+        for the others and is cancelled only when its last waiter leaves.
+        
+        Args:
+            key: Identity of the call, e.g. a prompt hash
+            fn: Zero-argument coroutine function performing the call
+            
+        Returns:
+            Result of fn
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Nobody else wants the result; stop the upstream call and
+                # make sure new callers start a fresh one
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters for upstream calls started and callers coalesced"""
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+    
+    def _finish(self, key: str, call: _Call) -> None:
+        self._forget(key, call)
+        # Mark the exception as retrieved when every waiter has gone away
+        if not call.task.cancelled():
+            call.task.exception()
+    
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,133 @@
+"""
+Cold start cost of the API, as paid by every new serverless instance.
+
+Each run starts a fresh interpreter that imports app.main, runs the
+startup hooks and serves GET /health in-process, timing each phase.
+Runs twice per database: the first start creates the schema, later ones
+should find the schema-version marker and skip migrations. Also reports
+the slowest imports from `python -X importtime` and fails if modules that
+should load lazily (python-docx, python-pptx, the Gemini client) are
+imported at startup.
+
+Usage (from the backend directory):
+    python -m benchmarks.cold_start --runs 5 --top 15
+    python -m benchmarks.cold_start --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+LAZY_MODULES = ["docx", "pptx", "google.generativeai"]
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+import asyncio
+import httpx
+
+async def serve():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/health")
+            response.raise_for_status()
+        return started, time.perf_counter()
+
+started, served = asyncio.run(serve())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (served - started) * 1000,
+    "total_ms": (served - start) * 1000,
+    "loaded": [name for name in LAZY_MODULES if name in sys.modules],
+}))
+"""
+
+
+def child_env(database: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{database}"
+    env.pop("ASYNC_DATABASE_URL", None)
+    env["JOB_WORKERS"] = "0"
+    env["LOG_LEVEL"] = "WARNING"
+    return env
+
+
+def run_child(database: str) -> dict:
+    code = f"LAZY_MODULES = {LAZY_MODULES!r}\n" + CHILD
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=child_env(database),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(database: str, top: int) -> list:
+    """(cumulative ms, self ms, module) for the slowest imports of app.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=child_env(database), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh databases to start against")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cold-start-bench-")
+    phases = ["import_ms", "startup_ms", "first_request_ms", "total_ms"]
+    results = {"first": [], "warm": []}
+    loaded = set()
+
+    for n in range(args.runs):
+        database = os.path.join(workdir, f"run{n}.db")
+        for kind in ("first", "warm"):
+            result = run_child(database)
+            results[kind].append(result)
+            loaded.update(result["loaded"])
+
+    print(f"Median of {args.runs} cold starts (ms):")
+    print(f"  {'database':<22}" + "".join(f"{p[:-3]:>15}" for p in phases))
+    for kind, label in (("first", "new (runs migrations)"), ("warm", "existing (marker)")):
+        medians = [statistics.median(r[p] for r in results[kind]) for p in phases]
+        print(f"  {label:<22}" + "".join(f"{m:>15.1f}" for m in medians))
+
+    print("\nSlowest imports (python -X importtime, cumulative ms):")
+    for cumulative, self_ms, name in slowest_imports(os.path.join(workdir, "importtime.db"), args.top):
+        print(f"  {cumulative:>9.1f} {self_ms:>9.1f}  {name}")
+
+    failed = False
+    if loaded:
+        print(f"\nFAIL: imported at startup but should load lazily: {', '.join(sorted(loaded))}")
+        failed = True
+
+    median_import = statistics.median(r["import_ms"] for r in results["warm"])
+    if args.max_import_ms is not None and median_import > args.max_import_ms:
+        print(f"\nFAIL: median import {median_import:.1f} ms exceeds {args.max_import_ms:.1f} ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Concurrent SQLite readers and writers against the application engine.
+
+Writer threads replay the /generate/content write-back pattern (update one
+section, commit, repeat) while reader threads list projects with their
+sections. Runs once on an engine built by create_db_engine and once on a
+bare create_engine for comparison, and reports throughput and the number
+of "database is locked" errors seen by each.
+
+Usage (from the backend directory):
+    python -m benchmarks.db_concurrency --writers 8 --readers 8 --ops 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, selectinload
+
+from app.database import Base, create_db_engine
+from app.models import User, Project, DocumentSection, DocumentType
+
+
+def seed(session_factory, projects: int, sections: int) -> list:
+    db = session_factory()
+    try:
+        user = User(username="bench", password_hash="x")
+        db.add(user)
+        db.flush()
+        for p in range(projects):
+            project = Project(user_id=user.id, title=f"Project {p}", doc_type=DocumentType.DOCX, topic="Benchmark")
+            project.sections = [
+                DocumentSection(title=f"Section {i}", order_index=i) for i in range(sections)
+            ]
+            db.add(project)
+        db.commit()
+        return [s.id for s in db.query(DocumentSection.id)]
+    finally:
+        db.close()
+
+
+def run(engine, writers: int, readers: int, ops: int) -> dict:
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    section_ids = seed(session_factory, projects=writers, sections=10)
+
+    errors = {"locked": 0, "other": 0}
+    counts = {"writes": 0, "reads": 0}
+    lock = threading.Lock()
+
+    def record(exc: Exception) -> None:
+        with lock:
+            errors["locked" if "locked" in str(exc) else "other"] += 1
+
+    def writer(n: int) -> None:
+        db = session_factory()
+        try:
+            for i in range(ops):
+                section_id = section_ids[(n * ops + i) % len(section_ids)]
+                try:
+                    db.get(DocumentSection, section_id).content = f"writer {n} op {i} " * 50
+                    db.commit()
+                    with lock:
+                        counts["writes"] += 1
+                except OperationalError as e:
+                    db.rollback()
+                    record(e)
+        finally:
+            db.close()
+
+    def reader() -> None:
+        db = session_factory()
+        try:
+            for _ in range(ops):
+                try:
+                    db.query(Project).options(selectinload(Project.sections)).all()
+                    db.rollback()
+                    with lock:
+                        counts["reads"] += 1
+                except OperationalError as e:
+                    db.rollback()
+                    record(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    return {
+        "elapsed": elapsed,
+        "writes_per_s": counts["writes"] / elapsed,
+        "reads_per_s": counts["reads"] / elapsed,
+        "locked": errors["locked"],
+        "other_errors": errors["other"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="operations per thread")
+    parser.add_argument("--baseline-timeout", type=float, default=0.1,
+                        help="sqlite3 lock timeout (s) for the untuned engine")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            "baseline": create_engine(
+                f"sqlite:///{os.path.join(tmp, 'baseline.db')}",
+                connect_args={"check_same_thread": False, "timeout": args.baseline_timeout}
+            ),
+            "tuned": create_db_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}"),
+        }
+
+        print(f"{args.writers} writers, {args.readers} readers, {args.ops} ops each\n")
+        print(f"{'engine':>10} {'elapsed s':>10} {'writes/s':>10} {'reads/s':>10} {'locked':>8} {'other':>7}")
+        results = {}
+        for name, engine in engines.items():
+            r = run(engine, args.writers, args.readers, args.ops)
+            results[name] = r
+            print(f"{name:>10} {r['elapsed']:>10.2f} {r['writes_per_s']:>10.0f} {r['reads_per_s']:>10.0f} "
+                  f"{r['locked']:>8} {r['other_errors']:>7}")
+
+    tuned = results["tuned"]
+    if tuned["locked"] or tuned["other_errors"]:
+        print("\nFAIL: the tuned engine hit database errors under concurrency")
+        sys.exit(1)
+    print("\nOK: no lock errors on the tuned engine")
+
+
+if __name__ == "__main__":
+    main()
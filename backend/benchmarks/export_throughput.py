@@ -0,0 +1,98 @@
+"""
+Throughput of concurrent exports: inline rendering vs the render pool.
+
+"inline" calls the docx/pptx services directly inside the coroutine, as
+export_document did before rendering moved to RenderService; every render
+blocks the event loop. "pool" submits to RenderService. Both modes run the
+same burst of concurrent renders while a heartbeat task records the worst
+event loop stall.
+
+Usage (from the backend directory):
+    python -m benchmarks.export_throughput --exports 16 --slides 50 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.services.render_service import RenderService, render_document
+
+
+def make_sections(count: int):
+    return [
+        {
+            "title": f"Slide {i + 1}",
+            "content": "\n".join(f"- Point {j + 1} about topic {i + 1} " * 3 for j in range(6)),
+        }
+        for i in range(count)
+    ]
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def run_burst(render, exports: int, doc_type: str, sections, directory: str) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        render(doc_type, f"Deck {i}", sections, os.path.join(directory, f"{i}.{doc_type}"))
+        for i in range(exports)
+    ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    return {
+        "elapsed": elapsed,
+        "exports_per_sec": exports / elapsed,
+        "max_loop_lag": max(lags) if lags else 0.0,
+    }
+
+
+async def main_async(args) -> None:
+    sections = make_sections(args.slides)
+
+    async def inline(doc_type, title, sections, path):
+        return render_document(doc_type, title, sections, path)
+
+    service = RenderService(workers=args.workers, queue_size=args.exports, timeout=600)
+    with tempfile.TemporaryDirectory() as directory:
+        # Warm the pool so process start-up is not counted
+        await asyncio.gather(*[
+            service.render(args.doc_type, "warmup", sections[:1], os.path.join(directory, f"warmup-{i}"))
+            for i in range(max(1, args.workers))
+        ])
+
+        results = {
+            "inline": await run_burst(inline, args.exports, args.doc_type, sections, directory),
+            "pool": await run_burst(service.render, args.exports, args.doc_type, sections, directory),
+        }
+    service.shutdown()
+
+    print(f"{args.exports} concurrent {args.doc_type} exports, {args.slides} sections each, "
+          f"{args.workers} workers")
+    print(f"{'mode':<8}{'elapsed':>10}{'exports/s':>12}{'max loop lag':>15}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['elapsed']:>9.2f}s{r['exports_per_sec']:>12.2f}"
+              f"{r['max_loop_lag'] * 1000:>13.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--exports", type=int, default=16)
+    parser.add_argument("--slides", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--doc-type", choices=["docx", "pptx"], default="pptx")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Storage and reconstruction cost of compressed refinement history.
+
+Simulates a section refined many times: every refinement rewrites a few
+sentences and sometimes adds a paragraph, with feedback entries in
+between. Encodes the history with the same code the migration uses and
+reports bytes stored against the old full-text columns, encode time per
+entry, and latency to rebuild a revision, for each keyframe interval.
+
+Usage (from the backend directory):
+    python -m benchmarks.history_storage --refinements 200 --intervals 1 5 10 25
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.history_service import encode_history, resolve_entry
+
+COMMON_WORDS = "the a of and to in for with on is are that this by as".split()
+SYLLABLES = "ra mo ti ne sa lu ver con pro ment tion ar el in ous ic al ge".split()
+
+
+def vocabulary(rng: random.Random, size: int = 3000) -> list:
+    """Common function words plus generated content words, roughly like prose"""
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+    return COMMON_WORDS * (size // 50) + words
+
+
+VOCABULARY = vocabulary(random.Random(0))
+
+
+def sentence(rng: random.Random) -> str:
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def simulate(refinements: int, paragraphs: int, seed: int) -> list:
+    """Return (id, previous, new) entries for one section"""
+    rng = random.Random(seed)
+    content = "\n\n".join(paragraph(rng) for _ in range(paragraphs))
+
+    entries = []
+    for i in range(refinements):
+        if i % 5 == 4:
+            # Feedback: content does not change
+            entries.append((len(entries) + 1, content, content))
+            continue
+
+        sentences = content.split(". ")
+        for _ in range(rng.randint(1, 3)):
+            sentences[rng.randrange(len(sentences))] = sentence(rng).rstrip(".")
+        new = ". ".join(sentences)
+        if rng.random() < 0.2:
+            new += "\n\n" + paragraph(rng)
+
+        entries.append((len(entries) + 1, content, new))
+        content = new
+    return entries
+
+
+def measure(entries: list, interval: int) -> dict:
+    start = time.perf_counter()
+    encoded = encode_history(entries, keyframe_interval=interval)
+    encode_time = time.perf_counter() - start
+
+    rows = {values["id"]: (values["base_id"], values["payload"]) for values in encoded}
+    latencies = []
+    for entry_id, previous, new in entries:
+        start = time.perf_counter()
+        revision = resolve_entry(entry_id, rows)
+        latencies.append(time.perf_counter() - start)
+        assert revision == (previous, new), f"entry {entry_id} did not round-trip"
+
+    latencies.sort()
+    return {
+        "interval": interval,
+        "stored": sum(len(values["payload"]) for values in encoded),
+        "encode_ms": encode_time / len(entries) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--refinements", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=8, help="paragraphs in the initial content")
+    parser.add_argument("--intervals", type=int, nargs="*", default=[1, 5, 10, 25])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    entries = simulate(args.refinements, args.paragraphs, args.seed)
+    full_text = sum(len(p.encode()) + len(n.encode()) for _, p, n in entries)
+    print(f"{len(entries)} entries, final content {len(entries[-1][2])} chars, "
+          f"full-text storage {full_text / 1024:.0f} KiB\n")
+
+    print(f"{'keyframe every':>15}{'stored KiB':>12}{'saved':>8}{'encode ms':>11}"
+          f"{'rebuild mean':>14}{'p95':>8}{'max':>8}")
+    for interval in args.intervals:
+        r = measure(entries, interval)
+        print(f"{r['interval']:>15}{r['stored'] / 1024:>12.1f}{1 - r['stored'] / full_text:>8.1%}"
+              f"{r['encode_ms']:>11.2f}{r['mean_ms']:>12.2f}ms{r['p95_ms']:>6.2f}ms{r['max_ms']:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Login throughput at different password hashing costs.
+
+For each cost, hashes one password and then runs a burst of concurrent
+verify_and_update_async calls, the work /auth/login does per request, on
+a PasswordHasher configured with that cost. Reports the time per hash and
+logins per second on this machine.
+
+Usage (from the backend directory):
+    python -m benchmarks.password_hashing --scheme pbkdf2_sha256 --rounds 29000 100000 600000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.auth import PasswordHasher, PASSWORD_HASH_WORKERS
+
+DEFAULT_ROUNDS = {
+    "pbkdf2_sha256": [29000, 100000, 310000, 600000],
+    "scrypt": [14, 15, 16],
+    "argon2": [2, 3, 4],
+    "bcrypt": [10, 12, 14],
+}
+
+
+async def measure(scheme: str, rounds: int, logins: int, workers: int) -> dict:
+    hasher = PasswordHasher(scheme=scheme, rounds=rounds, workers=workers)
+
+    start = time.perf_counter()
+    hashed = hasher.hash("benchmark-password")
+    hash_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        hasher.verify_and_update_async("benchmark-password", hashed) for _ in range(logins)
+    ])
+    elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+
+    return {"rounds": rounds, "hash_ms": hash_time * 1000, "logins_per_sec": logins / elapsed}
+
+
+async def main_async(args) -> None:
+    rounds_list = args.rounds or DEFAULT_ROUNDS.get(args.scheme)
+    if not rounds_list:
+        raise SystemExit(f"Pass --rounds for scheme {args.scheme}")
+
+    print(f"scheme={args.scheme} workers={args.workers} logins={args.logins} cpus={os.cpu_count()}")
+    print(f"{'rounds':>10}{'hash ms':>10}{'logins/s':>12}")
+    for rounds in rounds_list:
+        r = await measure(args.scheme, rounds, args.logins, args.workers)
+        print(f"{r['rounds']:>10}{r['hash_ms']:>10.1f}{r['logins_per_sec']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scheme", default="pbkdf2_sha256")
+    parser.add_argument("--rounds", type=int, nargs="*")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
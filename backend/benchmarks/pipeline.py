@@ -0,0 +1,288 @@
+"""
+End-to-end benchmark of the register -> generate -> export pipeline.
+
+Drives the FastAPI app in-process through httpx's ASGI transport against a
+throwaway SQLite database, with the LLM replaced by the fake provider. For
+every document size and concurrency level, each virtual user registers,
+logs in, creates a project, asks for an outline, generates all content,
+refines one section and exports the document. Reports p50/p95/p99 latency,
+requests per second and peak resident memory per endpoint, and can save
+the results as JSON and compare them against an earlier run.
+
+Usage (from the backend directory):
+    python -m benchmarks.pipeline --sizes 5 50 200 --concurrency 1 8 --output bench.json
+    python -m benchmarks.pipeline --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+ENDPOINTS = ["register", "login", "create_project", "outline", "content", "refine", "export"]
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the lifetime peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Recorder:
+    """Collects per-endpoint latencies and the peak RSS seen while each endpoint is in flight"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.peak_rss = defaultdict(int)
+        self.in_flight = defaultdict(int)
+
+    async def call(self, name: str, request):
+        self.in_flight[name] += 1
+        start = time.perf_counter()
+        try:
+            response = await request
+        finally:
+            self.in_flight[name] -= 1
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    async def sample_rss(self, interval: float, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            rss = current_rss()
+            for name, count in list(self.in_flight.items()):
+                if count:
+                    self.peak_rss[name] = max(self.peak_rss[name], rss)
+            await asyncio.sleep(interval)
+
+
+async def run_user(client, recorder: Recorder, user: str, sections: int, iterations: int,
+                   context_mode: str) -> None:
+    credentials = {"username": user, "password": "benchmark-password"}
+    await recorder.call("register", client.post("/auth/register", json=credentials))
+    response = await recorder.call("login", client.post("/auth/login", json=credentials))
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(iterations):
+        topic = f"{user} document {i}"
+        response = await recorder.call("outline", client.post(
+            "/generate/outline",
+            json={"topic": topic, "doc_type": "docx", "num_items": min(sections, 20)},
+            headers=headers
+        ))
+        response = await recorder.call("create_project", client.post(
+            "/projects/",
+            json={
+                "title": topic,
+                "topic": topic,
+                "doc_type": "docx",
+                "sections": [{"title": f"Section {n + 1}", "order_index": n} for n in range(sections)],
+            },
+            headers=headers
+        ))
+        project = response.json()
+
+        await recorder.call("content", client.post(
+            "/generate/content",
+            json={"project_id": project["id"], "context_mode": context_mode},
+            headers=headers
+        ))
+        await recorder.call("refine", client.post(
+            "/generate/refine",
+            json={"section_id": project["sections"][0]["id"], "prompt": "Make it more concise"},
+            headers=headers
+        ))
+        await recorder.call("export", client.get(f"/export/{project['id']}", headers=headers))
+
+
+async def run_scenario(app, sections: int, concurrency: int, iterations: int,
+                       context_mode: str, label: str) -> dict:
+    import httpx
+
+    recorder = Recorder()
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(recorder.sample_rss(0.01, stop))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_user(client, recorder, f"{label}-u{n}", sections, iterations, context_mode)
+            for n in range(concurrency)
+        ])
+        wall = time.perf_counter() - start
+
+    stop.set()
+    await sampler
+
+    endpoints = {}
+    for name in ENDPOINTS:
+        latencies = recorder.latencies.get(name)
+        if not latencies:
+            continue
+        endpoints[name] = {
+            "count": len(latencies),
+            "errors": recorder.errors[name],
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "rps": len(latencies) / wall,
+            "peak_rss_mb": recorder.peak_rss[name] / 2 ** 20,
+        }
+
+    total = sum(e["count"] for e in endpoints.values())
+    return {
+        "sections": sections,
+        "concurrency": concurrency,
+        "wall_s": wall,
+        "requests": total,
+        "rps": total / wall,
+        "endpoints": endpoints,
+    }
+
+
+def print_scenario(result: dict) -> None:
+    print(f"\n{result['sections']} sections x {result['concurrency']} users: "
+          f"{result['requests']} requests in {result['wall_s']:.2f}s ({result['rps']:.1f} req/s)")
+    print(f"  {'endpoint':<15}{'n':>5}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'RSS MB':>9}")
+    for name, e in result["endpoints"].items():
+        print(f"  {name:<15}{e['count']:>5}{e['errors']:>5}{e['p50_ms']:>10.1f}{e['p95_ms']:>10.1f}"
+              f"{e['p99_ms']:>10.1f}{e['rps']:>9.2f}{e['peak_rss_mb']:>9.1f}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print p95 changes against a baseline run; return True if any exceeds the threshold"""
+    previous = {(s["sections"], s["concurrency"]): s for s in baseline["scenarios"]}
+    regressed = False
+    print(f"\np95 against {baseline['meta']['commit']} (threshold +{threshold:.0%}):")
+    for scenario in current["scenarios"]:
+        before = previous.get((scenario["sections"], scenario["concurrency"]))
+        if before is None:
+            continue
+        for name, e in scenario["endpoints"].items():
+            old = before["endpoints"].get(name)
+            if not old or not old["p95_ms"]:
+                continue
+            change = e["p95_ms"] / old["p95_ms"] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"  {scenario['sections']:>4} sections x {scenario['concurrency']:<3} {name:<15}"
+                  f"{old['p95_ms']:>9.1f} -> {e['p95_ms']:>9.1f} ms ({change:+.0%}){flag}")
+    return regressed
+
+
+async def main_async(args) -> dict:
+    # The app reads its configuration at import time
+    from app.main import app
+    from app.services.llm_service import llm_service
+    from app.services.llm_providers import FakeProvider
+
+    llm_service.provider = FakeProvider(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    )
+
+    scenarios = []
+    async with app.router.lifespan_context(app):
+        # Start the render pool and warm imports and caches outside the measurements
+        for n in range(args.warmup):
+            await run_scenario(app, 2, 1, 1, args.context_mode, f"warmup{n}")
+
+        for sections in args.sizes:
+            for concurrency in args.concurrency:
+                label = f"s{sections}c{concurrency}"
+                result = await run_scenario(app, sections, concurrency, args.iterations,
+                                            args.context_mode, label)
+                print_scenario(result)
+                scenarios.append(result)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[5, 50, 200], help="sections per document")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 8], help="simultaneous users")
+    parser.add_argument("--iterations", type=int, default=1, help="pipelines per user")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured pipelines run first")
+    parser.add_argument("--context-mode", default="outline", choices=["outline", "chained"])
+    parser.add_argument("--latency", default="fixed:0.05", help="fake LLM latency spec, e.g. lognormal:0.8,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare p95 against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 increase counted as a regression")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["EXPORT_CACHE_DIR"] = os.path.join(workdir, "exports")
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ.pop("LLM_CACHE_PATH", None)
+    # Per-request log lines would swamp the report
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = asyncio.run(main_async(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import AuthenticatedUser, PrincipalCache, password_hasher, principal_cache
+from app.database import Base, create_async_db_engine, create_db_engine, get_async_db
+from app.models import User
+from app.routers import auth
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    principal_cache.clear()
+    yield sessionmaker(bind=engine)
+    principal_cache.clear()
+    engine.dispose()
+
+
+def test_cache_evicts_least_recently_used_principal():
+    cache = PrincipalCache(ttl=60, max_entries=2)
+    for user_id, name in enumerate(["ada", "bob", "cy"], start=1):
+        if name == "cy":
+            # Touching ada makes bob the oldest entry
+            assert cache.get("ada") == AuthenticatedUser(id=1, username="ada")
+        cache.set(AuthenticatedUser(id=user_id, username=name))
+
+    assert cache.get("bob") is None
+    assert [cache.get(name).id for name in ("ada", "cy")] == [1, 3]
+
+
+def test_cache_without_ttl_stores_nothing():
+    cache = PrincipalCache(ttl=0)
+    cache.set(AuthenticatedUser(id=1, username="ada"))
+    assert cache.get("ada") is None
+
+
+def test_invalidate_drops_only_that_user():
+    cache = PrincipalCache(ttl=60)
+    cache.set(AuthenticatedUser(id=1, username="ada"))
+    cache.set(AuthenticatedUser(id=2, username="bob"))
+    cache.invalidate(1)
+    assert cache.get("ada") is None
+    assert cache.get("bob") == AuthenticatedUser(id=2, username="bob")
+
+
+def test_updating_or_deleting_a_user_invalidates_the_cached_principal(session_factory):
+    with session_factory() as db:
+        ada, bob = User(username="ada", password_hash="x"), User(username="bob", password_hash="x")
+        db.add_all([ada, bob])
+        db.commit()
+        for user in (ada, bob):
+            principal_cache.set(AuthenticatedUser(id=user.id, username=user.username))
+
+        ada.username = "ada.lovelace"
+        db.commit()
+        assert principal_cache.get("ada") is None
+        assert principal_cache.get("bob") is not None
+
+        db.delete(bob)
+        db.commit()
+        assert principal_cache.get("bob") is None
+
+
+def legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def test_legacy_hash_is_verified_and_replaced():
+    valid, new_hash = password_hasher.verify_and_update("hunter22", legacy_hash("hunter22"))
+    assert valid
+    assert new_hash != legacy_hash("hunter22")
+    assert password_hasher.verify_and_update("hunter22", new_hash) == (True, None)
+
+
+def test_wrong_password_against_legacy_hash_is_rejected():
+    assert password_hasher.verify_and_update("hunter23", legacy_hash("hunter22")) == (False, None)
+
+
+def test_login_upgrades_a_legacy_hash(tmp_path):
+    path = tmp_path / "app.db"
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(username="ada", password_hash=legacy_hash("hunter22")))
+        db.commit()
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    sessions = async_sessionmaker(create_async_db_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_db
+    client = TestClient(app)
+
+    assert client.post("/auth/login", json={"username": "ada", "password": "hunter23"}).status_code == 401
+    response = client.post("/auth/login", json={"username": "ada", "password": "hunter22"})
+    assert response.status_code == 200
+    with sessionmaker(bind=engine)() as db:
+        stored = db.query(User.password_hash).filter(User.username == "ada").scalar()
+    assert stored != legacy_hash("hunter22")
+    assert password_hasher.verify_and_update("hunter22", stored) == (True, None)
+
+    # The upgraded hash keeps working
+    assert client.post("/auth/login", json={"username": "ada", "password": "hunter22"}).status_code == 200
+    engine.dispose()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import re
+
+from app.services.generation_service import GenerationService
+from app.services.llm_providers import LLMProvider
+from app.services.llm_service import LLMService, parse_batch_response
+
+TITLES = ["Introduction", "Market Size", "Risks"]
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers batch prompts with a fixed text and single sections by title"""
+
+    name = model_name = "scripted"
+
+    def __init__(self, batch_answer):
+        self.batch_answer = batch_answer
+        self.batch_calls = 0
+        self.section_calls = []
+
+    def generate(self, prompt):
+        if "Return ONLY a JSON object" in prompt:
+            self.batch_calls += 1
+            if isinstance(self.batch_answer, Exception):
+                raise self.batch_answer
+            return self.batch_answer
+        title = re.search(r"^(?:Section|Slide Title): (.+)$", prompt, re.MULTILINE).group(1)
+        self.section_calls.append(title)
+        return f"single {title}"
+
+
+def generate(batch_answer):
+    provider = ScriptedProvider(batch_answer)
+    service = GenerationService(
+        llm=LLMService(provider=provider, cache=None, max_retries=0), batch_size=len(TITLES)
+    )
+    sections = [{"id": i + 1, "title": title, "order_index": i} for i, title in enumerate(TITLES)]
+    results = asyncio.run(service.generate_sections("Topic", "pptx", sections))
+    return provider, [result["content"] for result in results]
+
+
+def test_parse_plain_object():
+    text = json.dumps({"Introduction": "a", "Market Size": "b", "Risks": "c"})
+    assert parse_batch_response(text, TITLES) == {0: "a", 1: "b", 2: "c"}
+
+
+def test_parse_fenced_output_with_surrounding_text():
+    text = 'Here you go:\n```json\n{"Introduction": "a", "Risks": "c"}\n```\nEnjoy!'
+    assert parse_batch_response(text, TITLES) == {0: "a", 2: "c"}
+    assert parse_batch_response('```json\n{"Risks": "c"}\n```', TITLES) == {2: "c"}
+
+
+def test_parse_malformed_json_returns_nothing():
+    assert parse_batch_response('{"Introduction": "a", "Risks": ', TITLES) == {}
+    assert parse_batch_response("no json at all", TITLES) == {}
+    assert parse_batch_response('["a", "b", "c"]', TITLES) == {}
+
+
+def test_parse_leaves_out_missing_and_empty_sections():
+    text = json.dumps({"Introduction": "a", "Market Size": "  "})
+    assert parse_batch_response(text, TITLES) == {0: "a"}
+
+
+def test_parse_ignores_extra_and_out_of_range_sections():
+    text = json.dumps({
+        "1. Introduction": "a",
+        "Slide 2: Market Size": "b",
+        "Conclusion": "extra",
+        "4. Outlook": "out of range",
+    })
+    assert parse_batch_response(text, TITLES) == {0: "a", 1: "b"}
+
+
+def test_parse_list_of_items_and_bullet_arrays():
+    text = json.dumps({"sections": [
+        {"title": "introduction", "content": ["one", "two"]},
+        {"title": "Risks", "content": "c"},
+        "not an item",
+    ]})
+    assert parse_batch_response(text, TITLES) == {0: "one\ntwo", 2: "c"}
+
+
+def test_parse_never_matches_repeated_titles():
+    text = json.dumps({"Risks": "c", "Introduction": "a"})
+    assert parse_batch_response(text, ["Risks", "Introduction", "Risks"]) == {1: "a"}
+
+
+def test_batch_answer_covers_every_section():
+    provider, contents = generate(json.dumps({"Introduction": "a", "Market Size": "b", "Risks": "c"}))
+    assert contents == ["a", "b", "c"]
+    assert provider.batch_calls == 1
+    assert provider.section_calls == []
+
+
+def test_missing_sections_fall_back_to_single_calls():
+    provider, contents = generate(json.dumps({"Market Size": "b", "Unrelated": "x"}))
+    assert contents == ["single Introduction", "b", "single Risks"]
+    assert sorted(provider.section_calls) == ["Introduction", "Risks"]
+
+
+def test_malformed_batch_answer_falls_back_for_every_section():
+    provider, contents = generate("Sorry, I cannot produce JSON today")
+    assert contents == [f"single {title}" for title in TITLES]
+    assert sorted(provider.section_calls) == sorted(TITLES)
+
+
+def test_failed_batch_call_falls_back_for_every_section():
+    provider, contents = generate(RuntimeError("upstream down"))
+    assert contents == [f"single {title}" for title in TITLES]
+    assert provider.batch_calls == 1
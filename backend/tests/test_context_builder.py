@@ -0,0 +1,59 @@
+from app.services.context_builder import ContextBuilder, count_tokens, key_points
+
+CONTENT = (
+    "Solar capacity doubled in five years. "
+    "Prices for solar panels fell faster than any forecast expected. "
+    "Grid operators now plan storage alongside solar capacity. "
+    "Some regions still lack transmission lines."
+)
+
+
+def builder(sections, budget, points=2):
+    context = ContextBuilder(budget_tokens=budget, points_per_section=points)
+    for index in range(sections):
+        context.add(f"Section {index + 1}", CONTENT)
+    return context
+
+
+def test_key_points_keep_the_first_sentence_and_original_order():
+    points = key_points(CONTENT, 2)
+    assert len(points) == 2
+    assert points[0] == "Solar capacity doubled in five years."
+    assert CONTENT.index(points[0]) < CONTENT.index(points[1])
+    assert key_points(CONTENT, 0) == []
+
+
+def test_small_document_gets_titles_and_key_points():
+    text = builder(2, budget=300).build()
+    assert text.startswith("\n- Section 1: Solar capacity doubled")
+    assert text.count("Solar capacity doubled") == 2
+    assert count_tokens(text) <= 300
+
+
+def test_context_never_exceeds_the_budget():
+    for sections in (1, 5, 20, 80):
+        for budget in (20, 60, 150, 300):
+            assert count_tokens(builder(sections, budget).build()) <= budget
+
+
+def test_long_document_keeps_the_most_recent_titles():
+    text = builder(80, budget=100).build()
+    lines = text.strip().split("\n")
+    omitted = int(lines[0].strip("(").split()[0])
+    titles = [line.split(":")[0] for line in lines[1:]]
+    assert lines[0] == f"({omitted} earlier sections omitted)"
+    assert titles == [f"- Section {index}" for index in range(omitted + 1, 81)]
+
+
+def test_key_points_go_to_the_newest_sections_first():
+    text = builder(6, budget=80).build()
+    lines = text.strip().split("\n")
+    detailed = [":" in line for line in lines]
+    assert detailed[-1]
+    # Once a section is left with only its title, every older one is too
+    assert detailed == sorted(detailed)
+
+
+def test_budget_too_small_for_any_title_gives_no_context():
+    assert builder(3, budget=2).build() == ""
+    assert ContextBuilder(budget_tokens=300).build() == ""
@@ -0,0 +1,64 @@
+import threading
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import DocumentSection, DocumentType, Project, User
+
+WRITERS = 4
+READERS = 4
+OPS = 40
+
+
+def test_concurrent_writers_and_readers_never_see_a_locked_database(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        user = User(username="writer", password_hash="x")
+        project = Project(user=user, title="P", topic="T", doc_type=DocumentType.DOCX,
+                          sections=[DocumentSection(title=f"S{i}", order_index=i) for i in range(WRITERS)])
+        db.add(project)
+        db.commit()
+        section_ids = [section.id for section in project.sections]
+
+    errors = []
+
+    def write(section_id):
+        # The /generate/content write-back pattern: update one section, commit
+        for i in range(OPS):
+            try:
+                with Session() as db:
+                    db.get(DocumentSection, section_id).content = f"revision {i}"
+                    db.commit()
+            except OperationalError as e:
+                errors.append(e)
+
+    def read():
+        for _ in range(OPS):
+            try:
+                with Session() as db:
+                    db.execute(select(Project).options(selectinload(Project.sections))).scalars().all()
+            except OperationalError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(section_id,)) for section_id in section_ids]
+    threads += [threading.Thread(target=read) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session() as db:
+        finished = db.scalar(
+            select(func.count()).select_from(DocumentSection)
+            .where(DocumentSection.content == f"revision {OPS - 1}")
+        )
+    engine.dispose()
+
+    # "database is locked" is the OperationalError the busy timeout and WAL prevent
+    assert [str(e) for e in errors] == []
+    assert finished == WRITERS
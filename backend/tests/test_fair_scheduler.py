@@ -0,0 +1,159 @@
+import asyncio
+
+from app.services.fair_scheduler import FairScheduler, Priority, Tenant
+
+
+def bulk(user_id):
+    return Tenant(user_id=user_id, priority=Priority.BULK)
+
+
+def interactive(user_id):
+    return Tenant(user_id=user_id, priority=Priority.INTERACTIVE)
+
+
+async def hold(scheduler, ticket, release, started, name):
+    async with scheduler.slot(ticket):
+        started.append(name)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_per_user_cap_leaves_slots_for_other_users():
+    async def scenario():
+        scheduler = FairScheduler(4, per_user=2, reserved=0)
+        release, started = asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(1)), release, started, f"a{i}"))
+                 for i in range(3)]
+        await settle()
+        capped = list(started)
+        tasks.append(asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(2)), release, started, "b0")))
+        await settle()
+        other_user = list(started)
+        release.set()
+        await asyncio.gather(*tasks)
+        return capped, other_user, scheduler.active
+
+    capped, other_user, active = asyncio.run(scenario())
+    assert capped == ["a0", "a1"]
+    assert other_user == ["a0", "a1", "b0"]
+    assert active == 0
+
+
+def test_bulk_calls_leave_the_reserved_slot_to_interactive_calls():
+    async def scenario():
+        scheduler = FairScheduler(3, per_user=0, reserved=1)
+        release, started = asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(1)), release, started, f"bulk{i}"))
+                 for i in range(3)]
+        await settle()
+        before = list(started)
+        tasks.append(asyncio.create_task(
+            hold(scheduler, scheduler.ticket(tenant=interactive(2)), release, started, "interactive")
+        ))
+        await settle()
+        after = list(started)
+        release.set()
+        await asyncio.gather(*tasks)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before == ["bulk0", "bulk1"]
+    assert after == ["bulk0", "bulk1", "interactive"]
+
+
+def test_light_user_is_not_queued_behind_heavy_user():
+    async def scenario():
+        scheduler = FairScheduler(1, per_user=0, reserved=0)
+        order = []
+
+        async def call(ticket, name):
+            async with scheduler.slot(ticket):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        # Tickets are taken up front so arrival order is fixed: the heavy
+        # user queues six calls before the light user sends two
+        calls = [(scheduler.ticket(10, bulk(1)), f"heavy{i}") for i in range(6)]
+        calls += [(scheduler.ticket(10, bulk(2)), f"light{i}") for i in range(2)]
+        await asyncio.gather(*[call(ticket, name) for ticket, name in calls])
+        return order
+
+    order = asyncio.run(scenario())
+    assert order[:4] == ["heavy0", "light0", "heavy1", "light1"]
+    assert order[4:] == ["heavy2", "heavy3", "heavy4", "heavy5"]
+
+
+def test_interactive_calls_go_before_earlier_bulk_calls():
+    async def scenario():
+        scheduler = FairScheduler(1, per_user=0, reserved=0)
+        release, started = asyncio.Event(), []
+        holder = asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(1)), release, started, "holder"))
+        await settle()
+        order = []
+
+        async def call(ticket, name):
+            async with scheduler.slot(ticket):
+                order.append(name)
+
+        tasks = [asyncio.create_task(call(scheduler.ticket(tenant=bulk(1)), "bulk"))]
+        tasks.append(asyncio.create_task(call(scheduler.ticket(tenant=interactive(2)), "interactive")))
+        await settle()
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk"]
+
+
+def test_cancelled_waiter_is_removed_from_the_queue():
+    async def scenario():
+        scheduler = FairScheduler(1, per_user=0, reserved=0)
+        release, started = asyncio.Event(), []
+        holder = asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(1)), release, started, "holder"))
+        await settle()
+        waiter = asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(2)), release, started, "waiter"))
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        waiting = scheduler.stats()["waiting"]["bulk"]
+        release.set()
+        await holder
+        return waiting, started, scheduler.active
+
+    waiting, started, active = asyncio.run(scenario())
+    assert waiting == 0
+    assert started == ["holder"]
+    assert active == 0
+
+
+def test_slot_granted_to_a_cancelled_caller_is_given_back():
+    async def scenario():
+        scheduler = FairScheduler(1, per_user=0, reserved=0)
+        release, started = asyncio.Event(), []
+        waiter = None
+
+        async def holder():
+            async with scheduler.slot(scheduler.ticket(tenant=bulk(1))):
+                await release.wait()
+            # The slot was just handed to the waiter, which has not resumed yet
+            waiter.cancel()
+
+        holding = asyncio.create_task(holder())
+        await settle()
+        waiter = asyncio.create_task(hold(scheduler, scheduler.ticket(tenant=bulk(2)), release, started, "waiter"))
+        await settle()
+        release.set()
+        await holding
+        await asyncio.gather(waiter, return_exceptions=True)
+        after_cancel = scheduler.active
+
+        await asyncio.wait_for(hold(scheduler, scheduler.ticket(tenant=bulk(3)), release, started, "late"), 1)
+        return after_cancel, started
+
+    after_cancel, started = asyncio.run(scenario())
+    assert after_cancel == 0
+    assert started == ["late"]
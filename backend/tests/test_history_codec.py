@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database import Base
+from app.models import FeedbackType
+from app.services.history_service import (
+    HistoryService, apply_delta, decode_entry, encode_entry, encode_history, make_delta, resolve_entry
+)
+
+REVISIONS = [
+    None,
+    "Solar power is growing fast.",
+    "Solar power is growing fast.\n\n  It is now the cheapest source in many markets.",
+    "Solar power is growing very fast.\n\n  It is now the cheapest source in many markets.",
+    "Wind and solar are growing very fast.\n\n  It is now the cheapest source in many markets.\n",
+    "",
+    "   Leading whitespace\tand tabs  survive.  ",
+    "Final text.",
+]
+
+
+def history_entries():
+    """(id, previous, new) for a run of refinements with a feedback entry in between"""
+    entries = []
+    for index, (previous, new) in enumerate(zip(REVISIONS, REVISIONS[1:])):
+        entries.append((len(entries) + 1, previous, new))
+        if index == 2:
+            # Feedback leaves the content as it is
+            entries.append((len(entries) + 1, new, new))
+    return entries
+
+
+def test_delta_round_trip():
+    for reference in REVISIONS[1:]:
+        for text in REVISIONS[1:]:
+            assert apply_delta(reference, make_delta(reference, text)) == text
+
+
+def test_entry_round_trip_with_missing_content():
+    assert decode_entry(encode_entry(None, "new")) == (None, "new")
+    assert decode_entry(encode_entry("old", None)) == ("old", None)
+    assert decode_entry(encode_entry(None, None)) == (None, None)
+
+
+def test_feedback_entry_stores_a_single_range():
+    text = REVISIONS[2]
+    payload = encode_entry(text, text, reference=REVISIONS[1], keyframe=False)
+    assert decode_entry(payload, REVISIONS[1]) == (text, text)
+    ops = make_delta(text, text)
+    assert len(ops) == 1 and not isinstance(ops[0], str)
+
+
+def test_chain_rebuilds_every_entry_across_keyframes():
+    entries = history_entries()
+    encoded = encode_history(entries, keyframe_interval=3)
+    rows = {values["id"]: (values["base_id"], values["payload"]) for values in encoded}
+
+    assert [values["chain_length"] for values in encoded] == [0, 1, 2, 0, 1, 2, 0, 1]
+    assert [values["keyframe_id"] for values in encoded] == [None, 1, 1, None, 4, 4, None, 7]
+    for entry_id, previous, new in entries:
+        assert resolve_entry(entry_id, rows) == (previous, new)
+
+
+def test_service_records_and_reconstructs_across_keyframes():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        service = HistoryService(keyframe_interval=3)
+        recorded = []
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            for _, previous, new in history_entries():
+                feedback = FeedbackType.NONE if previous != new else FeedbackType.LIKE
+                entry = await service.record(db, 1, previous, new, feedback=feedback)
+                await db.commit()
+                recorded.append(entry)
+            rebuilt = [await service.reconstruct(db, entry) for entry in recorded]
+        await engine.dispose()
+        return recorded, rebuilt
+
+    recorded, rebuilt = asyncio.run(scenario())
+    assert [entry.chain_length for entry in recorded] == [0, 1, 2, 0, 1, 2, 0, 1]
+    assert rebuilt == [(previous, new) for _, previous, new in history_entries()]
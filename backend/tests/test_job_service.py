@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+from app.services.job_service import JobService
+
+
+def test_worker_survives_database_errors(caplog):
+    async def scenario():
+        service = JobService(workers=1, poll_interval=0.01)
+        claims, failures = [], []
+
+        async def claim_next():
+            claims.append(1)
+            if len(claims) == 1:
+                raise RuntimeError("database is locked")
+            # Hand out one job, then report an empty queue
+            return 7 if len(claims) == 2 else None
+
+        async def run(job_id):
+            raise RuntimeError("generation crashed")
+
+        async def mark_failed(job_id, error):
+            failures.append((job_id, error))
+            raise RuntimeError("database is locked")
+
+        service._claim_next = claim_next
+        service._run = run
+        service._mark_failed = mark_failed
+        await service.start()
+        await asyncio.sleep(0.1)
+        alive = not service._tasks[0].done()
+        # Not stop(), which hands running jobs back through the database
+        service._tasks[0].cancel()
+        await asyncio.gather(*service._tasks, return_exceptions=True)
+        return alive, len(claims), failures
+
+    with caplog.at_level(logging.ERROR, logger="app.services.job_service"):
+        alive, claims, failures = asyncio.run(scenario())
+    assert alive
+    assert claims > 3
+    assert failures == [(7, "generation crashed")]
+    assert "Error claiming the next generation job" in caplog.text
+    assert "Error marking generation job 7 failed" in caplog.text
@@ -0,0 +1,90 @@
+import asyncio
+
+from app.services.llm_cache import LLMCache, make_cache_key
+from app.services.llm_providers import FakeProvider
+from app.services.llm_service import LLMService
+
+
+def disk_rows(cache):
+    return cache._disk.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def test_key_ignores_whitespace_but_not_model_or_template():
+    key = make_cache_key("model", "1", "Write  about\nsolar")
+    assert key == make_cache_key("model", "1", "Write about solar")
+    assert key != make_cache_key("other", "1", "Write about solar")
+    assert key != make_cache_key("model", "2", "Write about solar")
+
+
+def test_expired_entries_are_misses():
+    cache = LLMCache(ttl=-1)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_disk_entries_are_removed(tmp_path):
+    cache = LLMCache(ttl=-1, path=str(tmp_path / "cache.db"))
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert disk_rows(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_tier_stays_within_its_byte_limit():
+    cache = LLMCache(max_bytes=10)
+    cache.set("a", "12345678")
+    cache.set("b", "abcd")
+    cache.set("huge", "x" * 11)
+    assert cache.get("a") is None
+    assert cache.get("b") == "abcd"
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 4
+
+
+def test_disk_tier_survives_a_restart_and_is_trimmed(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def fill():
+        cache = LLMCache(max_entries=2, path=path, disk_max_entries=10)
+        for i in range(30):
+            cache.set_async(f"k{i}", f"v{i}")
+        # Wait for the queued background writes
+        await asyncio.get_running_loop().run_in_executor(cache._disk_executor, lambda: None)
+        return disk_rows(cache)
+
+    rows = asyncio.run(fill())
+    assert rows <= 11
+
+    restarted = LLMCache(path=path)
+    assert asyncio.run(restarted.get_async("k29")) == "v29"
+    assert restarted.get("k0") is None
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_bypass_cache_calls_the_model_again():
+    async def scenario():
+        provider = FakeProvider(latency="fixed:0", tokens_per_second=0)
+        service = LLMService(provider=provider, cache=LLMCache())
+        first = await service.generate_outline("Solar", "docx", 3)
+        cached = await service.generate_outline("Solar", "docx", 3)
+        calls_after_hit = provider.calls
+        await service.generate_outline("Solar", "docx", 3, use_cache=False)
+        return first, cached, calls_after_hit, provider.calls
+
+    first, cached, calls_after_hit, calls = asyncio.run(scenario())
+    assert cached == first
+    assert calls_after_hit == 1
+    assert calls == 2
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from app.services.fair_scheduler import FairScheduler
+from app.services.llm_providers import FakeProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+
+LATENCY = 0.3
+CALLS = 6
+
+
+def test_parallel_calls_do_not_wait_for_each_other():
+    async def scenario():
+        service = LLMService(
+            provider=FakeProvider(latency=f"fixed:{LATENCY}", tokens_per_second=0),
+            max_concurrency=CALLS, cache=None, rate_limiter=RateLimiter(0, 0)
+        )
+        # No per-user cap or reserve, so only the model latency is measured
+        service.scheduler = FairScheduler(CALLS, per_user=0, reserved=0)
+        gaps = []
+
+        async def ticker():
+            # Each sleep returns late by however long the loop was blocked
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - before)
+
+        probe = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        contents = await asyncio.gather(*[
+            service.generate_content("Topic", f"Section {i}", "docx", use_cache=False)
+            for i in range(CALLS)
+        ])
+        elapsed = time.perf_counter() - start
+        probe.cancel()
+        return contents, elapsed, max(gaps)
+
+    contents, elapsed, longest_gap = asyncio.run(scenario())
+    assert len(set(contents)) == CALLS
+    # Serialized calls would take CALLS * LATENCY
+    assert elapsed < CALLS * LATENCY / 2
+    # A blocked loop would stall the ticker for a whole call
+    assert longest_gap < LATENCY / 2
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import AuthenticatedUser, get_current_user
+from app.database import Base, create_async_db_engine, create_db_engine, get_async_db
+from app.models import DocumentSection, DocumentType, FeedbackType, Project, RefinementHistory, User
+from app.pagination import decode_cursor, encode_cursor
+from app.routers import history, projects
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Sync session factory for seeding, and the URL of the same file"""
+    path = tmp_path / "app.db"
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine), f"sqlite+aiosqlite:///{path}"
+    engine.dispose()
+
+
+def client_for(async_url, *routers, user_id=1):
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+    session_factory = async_sessionmaker(create_async_db_engine(async_url), expire_on_commit=False)
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_db
+    app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(id=user_id, username="owner")
+    return TestClient(app)
+
+
+def fetch_all(client, url, limit, **params):
+    """Follow X-Next-Cursor until the last page"""
+    pages, cursor = [], None
+    while True:
+        query = {**params, "limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(url, params=query)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("created_at", START, 42)
+    assert decode_cursor(cursor, "created_at") == (START, 42)
+    assert decode_cursor(encode_cursor("title", "Solar", 7), "title") == ("Solar", 7)
+
+
+def test_cursor_for_another_sort_or_garbage_is_rejected():
+    cursor = encode_cursor("title", "Solar", 7)
+    for bad in [(cursor, "created_at"), ("not-a-cursor", "title")]:
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(*bad)
+        assert error.value.status_code == 400
+
+
+def test_project_pages_cover_every_project_once(database):
+    Session, async_url = database
+    with Session() as db:
+        owner, other = User(username="owner", password_hash="x"), User(username="other", password_hash="x")
+        db.add_all([owner, other])
+        db.flush()
+        for i in range(7):
+            # Pairs share a timestamp, so ties are broken by id
+            db.add(Project(user_id=owner.id, title=f"Project {i}", doc_type=DocumentType.DOCX,
+                           created_at=START + timedelta(minutes=i // 2),
+                           sections=[DocumentSection(title=f"S{j}", order_index=j) for j in range(i % 3)]))
+        db.add(Project(user_id=other.id, title="Not mine", doc_type=DocumentType.PPTX))
+        db.commit()
+
+    client = client_for(async_url, projects.router, user_id=1)
+    pages = fetch_all(client, "/projects/", limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    listed = [project["title"] for page in pages for project in page]
+    assert listed == [f"Project {i}" for i in reversed(range(7))]
+    assert [project["section_count"] for page in pages for project in page] == [i % 3 for i in reversed(range(7))]
+
+    by_title = [project["title"] for page in fetch_all(client, "/projects/", limit=2, sort="title")
+                for project in page]
+    assert by_title == [f"Project {i}" for i in range(7)]
+
+
+def test_history_pages_run_newest_first_and_filter_by_kind(database):
+    Session, async_url = database
+    with Session() as db:
+        section = DocumentSection(title="S", order_index=0)
+        db.add(Project(user=User(username="owner", password_hash="x"), title="P",
+                       doc_type=DocumentType.DOCX, sections=[section]))
+        db.flush()
+        for i in range(6):
+            # Even entries are refinements, odd ones likes; pairs share a timestamp
+            db.add(RefinementHistory(
+                section_id=section.id, created_at=START + timedelta(minutes=i // 2),
+                prompt=f"prompt {i}" if i % 2 == 0 else None,
+                feedback=FeedbackType.NONE if i % 2 == 0 else FeedbackType.LIKE,
+                payload=b"not read by the listing"
+            ))
+        db.commit()
+        section_id = section.id
+
+    client = client_for(async_url, history.router)
+    url = f"/history/sections/{section_id}"
+
+    entries = [entry for page in fetch_all(client, url, limit=4) for entry in page]
+    assert [entry["id"] for entry in entries] == [6, 5, 4, 3, 2, 1]
+
+    refinements = [entry["prompt"] for page in fetch_all(client, url, limit=1, kind="refinement")
+                   for entry in page]
+    assert refinements == ["prompt 4", "prompt 2", "prompt 0"]
+
+    likes = [entry["feedback"] for page in fetch_all(client, url, limit=2, kind="feedback")
+             for entry in page]
+    assert likes == ["like"] * 3
@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.fair_scheduler import Priority, Tenant, current_tenant
+from app.services.llm_providers import FakeProvider, FakeProviderError
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter, TokenBucket
+
+BULK = (True, 0.0)
+INTERACTIVE = (False, 0.0)
+
+
+def throttled_limiter() -> RateLimiter:
+    # 10 requests per second with room for a single request at once
+    return RateLimiter(requests_per_minute=600, tokens_per_minute=0, burst_seconds=0.1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    # One unit per second, five seconds of burst
+    bucket = TokenBucket(per_minute=60, burst_seconds=5, clock=clock)
+    bucket.take(5)
+    assert bucket.delay(1) == 1.0
+
+    clock.now = 2.0
+    assert bucket.delay(2) == 0.0
+    assert bucket.delay(3) == 1.0
+
+    clock.now = 100.0
+    assert bucket.delay(5) == 0.0
+    assert bucket.level == bucket.capacity == 5
+
+
+def test_bucket_balance_can_go_negative():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, burst_seconds=5, clock=clock)
+    bucket.take(8)
+    assert bucket.level == -3
+    assert bucket.delay(1) == 4.0
+    # A request larger than the bucket waits for a full bucket only
+    assert bucket.delay(20) == 8.0
+
+    clock.now = 4.0
+    assert bucket.delay(1) == 0.0
+
+
+def test_consumed_response_tokens_delay_the_next_call():
+    async def scenario():
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=6000)
+        # 100 tokens per second, 10 at once
+        limiter.tokens = TokenBucket(per_minute=6000, burst_seconds=0.1, clock=clock)
+        await limiter.acquire(tokens=5)
+        limiter.consume(15)
+        before_refill = limiter.tokens.delay(1)
+        # Admitted without waiting once the clock has moved on
+        clock.now = 0.11
+        await asyncio.wait_for(limiter.acquire(tokens=1), timeout=1)
+        return before_refill, limiter.tokens.level
+
+    # The level is -10 after the response, so one more token takes 0.11s
+    before_refill, level = asyncio.run(scenario())
+    assert before_refill == pytest.approx(0.11)
+    assert level == pytest.approx(0.0)
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    assert not limiter.enabled
+    assert asyncio.run(limiter.acquire(tokens=10 ** 6)) == 0.0
+
+
+def retrying_service(**kwargs) -> LLMService:
+    settings = dict(max_retries=4, retry_base_delay=1.0, retry_max_delay=4.0, retry_deadline=100.0)
+    settings.update(kwargs)
+    return LLMService(provider=FakeProvider(latency="fixed:0", tokens_per_second=0), **settings)
+
+
+def test_retry_backoff_grows_exponentially_with_jitter():
+    service = retrying_service()
+    started = time.monotonic()
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 4.0)]:
+        for _ in range(20):
+            delay = service._retry_delay(FakeProviderError("busy"), attempt, started)
+            assert cap / 2 <= delay <= cap
+    assert service._retry_delay(asyncio.TimeoutError(), 1, started) is not None
+
+
+def test_no_retry_past_limits_or_for_permanent_errors():
+    service = retrying_service()
+    started = time.monotonic()
+    assert service._retry_delay(FakeProviderError("busy"), 5, started) is None
+    assert service._retry_delay(ValueError("bad request"), 1, started) is None
+    # The backoff would end past the deadline
+    assert service._retry_delay(FakeProviderError("busy"), 1, started - 99.6) is None
+
+
+def test_interactive_call_overtakes_queued_bulk_calls():
+    async def scenario():
+        limiter = throttled_limiter()
+        granted = []
+
+        async def call(name, order):
+            await limiter.acquire(order=order)
+            granted.append(name)
+
+        tasks = [asyncio.create_task(call(f"bulk{i}", BULK)) for i in range(4)]
+        await asyncio.sleep(0.01)
+        # However many were admitted meanwhile, the rest are still queued
+        ahead = list(granted)
+        tasks.append(asyncio.create_task(call("interactive", INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return ahead, granted
+
+    ahead, granted = asyncio.run(scenario())
+    assert len(ahead) < 4
+    assert granted == ahead + ["interactive"] + [f"bulk{i}" for i in range(len(ahead), 4)]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = throttled_limiter()
+        await limiter.acquire()
+        head = asyncio.create_task(limiter.acquire())
+        behind = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        head.cancel()
+        await asyncio.wait_for(behind, timeout=1)
+        return limiter.waiting
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_service_serves_interactive_calls_first_while_throttled():
+    async def scenario():
+        service = LLMService(
+            provider=FakeProvider(latency="fixed:0", tokens_per_second=0),
+            rate_limiter=throttled_limiter()
+        )
+        finished = []
+
+        async def generate(title):
+            await service.generate_content("Topic", title, "docx", use_cache=False)
+            finished.append(title)
+
+        # Tasks copy the context, so each call keeps the tenant set here
+        token = current_tenant.set(Tenant(user_id=1, priority=Priority.BULK))
+        tasks = [asyncio.create_task(generate(f"Bulk {i}")) for i in range(5)]
+        current_tenant.reset(token)
+        await asyncio.sleep(0.01)
+        # Calls already past the limiter finish first; the queued ones wait
+        queued = service.rate_limiter.waiting
+
+        current_tenant.set(Tenant(user_id=2, priority=Priority.INTERACTIVE))
+        await generate("Refinement")
+        await asyncio.gather(*tasks)
+        return finished, queued
+
+    finished, queued = asyncio.run(scenario())
+    assert queued > 0
+    assert finished.index("Refinement") == 5 - queued
@@ -0,0 +1,54 @@
+import asyncio
+
+from app.models import DocumentSection, SectionStatus
+from app.services.section_writer import SectionWriter
+
+
+class CountingSession:
+    def __init__(self):
+        self.commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+
+def section_results(count, failed=()):
+    return [
+        {"section_id": i, "content": None, "error": "upstream down"} if i in failed
+        else {"section_id": i, "content": f"text {i}", "error": None}
+        for i in range(count)
+    ]
+
+
+def write(results, batch_size):
+    async def scenario():
+        db = CountingSession()
+        sections = {result["section_id"]: DocumentSection(title="S", content="old") for result in results}
+        writer = SectionWriter(db, sections, batch_size=batch_size)
+        for result in results:
+            await writer.add(result)
+        committed_before_flush = db.commits
+        await writer.flush()
+        return committed_before_flush, db.commits, sections
+
+    return asyncio.run(scenario())
+
+
+def test_every_result_counts_toward_a_batch():
+    before_flush, commits, sections = write(section_results(12, failed={3, 7}), batch_size=5)
+    assert before_flush == 2
+    assert commits == 3
+    assert sections[3].status == SectionStatus.FAILED
+    assert sections[3].content == "old"
+    assert sections[4].status == SectionStatus.GENERATED
+
+
+def test_zero_batch_size_commits_once_at_the_end():
+    before_flush, commits, _ = write(section_results(12), batch_size=0)
+    assert before_flush == 0
+    assert commits == 1
+
+
+def test_flush_without_pending_results_does_not_commit():
+    _, commits, _ = write(section_results(5), batch_size=5)
+    assert commits == 1
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def upstream(release, calls):
+    async def fn():
+        calls.append(1)
+        await release.wait()
+        return "answer"
+    return fn
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def scenario():
+        flights, release, calls = SingleFlight(), asyncio.Event(), []
+        tasks = [asyncio.create_task(flights.do("prompt", upstream(release, calls))) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        # Once the call is over, the next caller starts a fresh one
+        again = await flights.do("prompt", upstream(release, calls))
+        return results, again, len(calls), flights.stats()
+
+    results, again, calls, stats = asyncio.run(scenario())
+    assert results == ["answer"] * 5
+    assert again == "answer"
+    assert calls == 2
+    assert stats == {"in_flight": 0, "started": 2, "coalesced": 4}
+
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        flights, release, calls = SingleFlight(), asyncio.Event(), []
+        release.set()
+        await asyncio.gather(flights.do("a", upstream(release, calls)), flights.do("b", upstream(release, calls)))
+        return len(calls)
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_error_reaches_every_waiter():
+    async def scenario():
+        flights, release = SingleFlight(), asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise ValueError("quota exceeded")
+
+        tasks = [asyncio.create_task(flights.do("prompt", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True), flights.stats()
+
+    errors, stats = asyncio.run(scenario())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_waiter_leaves_the_call_running_for_others():
+    async def scenario():
+        flights, release, calls = SingleFlight(), asyncio.Event(), []
+        first = asyncio.create_task(flights.do("prompt", upstream(release, calls)))
+        second = asyncio.create_task(flights.do("prompt", upstream(release, calls)))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second, len(calls)
+
+    first, result, calls = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "answer"
+    assert calls == 1
+
+
+def test_last_waiter_leaving_cancels_the_upstream_call():
+    async def scenario():
+        flights, release, calls = SingleFlight(), asyncio.Event(), []
+        waiter = asyncio.create_task(flights.do("prompt", upstream(release, calls)))
+        await asyncio.sleep(0)
+        call = flights._calls["prompt"]
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return call.task.cancelled(), flights.stats()["in_flight"]
+
+    upstream_cancelled, in_flight = asyncio.run(scenario())
+    assert upstream_cancelled
+    assert in_flight == 0
@@ -7,6 +7,8 @@ import { apiService } from '../services/api';
 export default function Dashboard() {
     const [projects, setProjects] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const navigate = useNavigate();
 
     useEffect(() => {
@@ -15,8 +17,9 @@ export default function Dashboard() {
 
     const loadProjects = async () => {
         try {
-            const data = await apiService.getProjects();
-            setProjects(data);
+            const page = await apiService.getProjects();
+            setProjects(page.items);
+            setNextCursor(page.nextCursor);
         } catch (error) {
             console.error('Failed to load projects:', error);
         } finally {
@@ -24,6 +27,19 @@ export default function Dashboard() {
         }
     };
 
+    const loadMoreProjects = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await apiService.getProjects(nextCursor);
+            setProjects(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Failed to load more projects:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleLogout = () => {
         apiService.logout();
         navigate('/login');
@@ -192,6 +208,21 @@ export default function Dashboard() {
                         ))}
                     </motion.div>
                 )}
+
+                {/* More projects than the first page */}
+                {!loading && nextCursor && (
+                    <div className="text-center" style={{ marginTop: 'var(--spacing-2xl)' }}>
+                        <motion.button
+                            className="btn btn-ghost"
+                            onClick={loadMoreProjects}
+                            disabled={loadingMore}
+                            whileHover={{ scale: 1.05 }}
+                            whileTap={{ scale: 0.95 }}
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </motion.button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -70,6 +70,12 @@ class ApiService {
 
       const data = await response.json();
       console.log('[API] Response data:', data);
+
+      // For paginated lists, also hand back the cursor of the next page
+      if (options.paginated) {
+        return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+      }
+
       return data;
     } catch (error) {
       console.error('API Error:', error);
@@ -103,8 +109,10 @@ class ApiService {
   }
 
   // Project endpoints
-  async getProjects() {
-    return this.request('/projects/');
+  // Returns one page, { items, nextCursor }; nextCursor is null on the last page
+  async getProjects(cursor = null) {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return this.request(`/projects/${query}`, { paginated: true });
   }
 
   async getProject(projectId) {